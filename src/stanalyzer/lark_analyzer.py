@@ -1,28 +1,139 @@
-from typing import Any
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from lark import Discard, Transformer, Token, Tree, Visitor, v_args
+
+# lark-cython 的 Token 既不继承 lark.Token 也不继承 str，需要一并识别
+try:
+    from lark_cython import Token as CyToken
+
+    _TOKEN_TYPES = (Token, CyToken)
+except ImportError:
+    _TOKEN_TYPES = (Token,)
+
+
+@dataclass(slots=True)
+class VarDecl:
+    """变量声明。工程里变量数量巨大，用 slots 类代替 dict，省内存且属性访问更快"""
+    name: str
+    type: str
+    init: Optional[dict] = None
+
+
+# 数据依赖分析：节点类型 -> 其中被读取的子节点字段
+_READ_CHILDREN = {
+    "binary_op": ("left", "right"),
+    "unary_op": ("operand",),
+    "assignment": ("expr", "target_metadata"),
+    "if_statement": ("condition", "then_branch", "else_branch"),
+    "case_statement": ("expression", "else_branch"),
+    "for_loop": ("from", "to", "step", "body"),
+    "while_loop": ("condition", "body"),
+}
+
+# 节点类型 -> 可能包含写操作的子语句块字段
+_WRITE_CHILDREN = {
+    "if_statement": ("then_branch", "else_branch"),
+    "case_statement": ("else_branch",),
+    "for_loop": ("body",),
+    "while_loop": ("body",),
+}
+
+
+# 读/写集合的返回值：空集合共享同一个对象，元素不超过 _POOL_MAX_SIZE 的集合按内容驻留
+_EMPTY: FrozenSet[str] = frozenset()
+_POOL_MAX_SIZE = 4
+
+
+def _target_name(target: Any) -> Optional[str]:
+    """赋值目标中被写入的变量名"""
+    if isinstance(target, dict):
+        return target.get("name") if target.get("type") == "variable" else None
+    return target if isinstance(target, str) else None
+
+
+class STDataflowVisitor(Visitor):
+    """
+    直接在 Lark 原始 Tree 上收集读/写变量，不构建字典 AST。
+    供只关心数据依赖的调用方使用 (见 STParser.analyze)；Visitor 自底向上迭代遍历，没有递归深度限制。
+    """
+
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+
+    def var(self, tree):
+        self.reads.add(tree.children[0].value)
+
+    def assign_stmt(self, tree):
+        # assign_stmt: IDENT ":=" expr ";"
+        self.writes.add(tree.children[0].value)
+
+    def for_stmt(self, tree):
+        # for_stmt: FOR IDENT ":=" expr TO expr ...，循环计数器同样被写入
+        self.writes.add(tree.children[1].value)
 
-from lark import Transformer, v_args
 
 # ==========================================
 # 3. 语义分析器 (负责将 AST 转换为 Python 字典)
 # ==========================================
 class STSemanticAnalyzer(Transformer):
-    @v_args(inline=True)
-    def IDENT(self, token): return str(token)
+    def __init__(self, visit_tokens: bool = True):
+        super().__init__(visit_tokens)
+        # get_read_vars / get_write_vars 的记忆化缓存: id(node) -> (node, 变量集合)
+        # 同时持有 node 引用，保证缓存存活期间其 id 不会被新对象复用
+        self._read_cache: dict = {}
+        self._write_cache: dict = {}
+        self._fs_pool: Dict[FrozenSet[str], FrozenSet[str]] = {}
+
+    def reset_cache(self):
+        """清空读/写集合缓存，在处理相互独立的工程之间、或原地修改过 AST 之后调用"""
+        self._read_cache.clear()
+        self._write_cache.clear()
+        self._fs_pool.clear()
+
+    def _freeze(self, names) -> FrozenSet[str]:
+        """结果统一为不可变 frozenset，调用方可直接共享缓存值；小集合按内容去重，相同读/写集合只保留一份"""
+        res = frozenset(names)
+        if not res:
+            return _EMPTY
+        if len(res) <= _POOL_MAX_SIZE:
+            res = self._fs_pool.setdefault(res, res)
+        return res
+
+    def _transform_children(self, children):
+        # Transformer 默认只对 lark.Token 调用终结符回调，这里补上 lark-cython 的 Token
+        for c in children:
+            if isinstance(c, Tree):
+                res = self._transform_tree(c)
+            elif self.__visit_tokens__ and isinstance(c, _TOKEN_TYPES):
+                res = self._call_userfunc_token(c)
+            else:
+                res = c
+
+            if res is not Discard:
+                yield res
 
+    # 标识符/类型名在工程里大量重复，驻留后重复出现的名字共享同一个 str 对象，
+    # 下游 get_read_vars 的集合/字典查找也能走指针比较的快路径
     @v_args(inline=True)
-    def TYPE(self, token): return str(token)
+    def IDENT(self, token): return sys.intern(token.value)
 
     @v_args(inline=True)
-    def num(self, token): return {"type": "literal", "value": str(token)}
+    def TYPE(self, token): return sys.intern(token.value)
+
+    # 数字与工业字面量 (T#1s, 16#FF) 在终结符层面直接产出字面量节点
+    def NUMBER(self, token): return {"type": "literal", "value": token.value}
+
+    def ST_LITERAL(self, token): return {"type": "literal", "value": token.value}
 
     @v_args(inline=True)
     def var(self, token): return {"type": "variable", "name": str(token)}
 
-    # --- 新增：工业字面量、负数与 RETURN 语句 ---
-    @v_args(inline=True)
-    def literal(self, token): return {"type": "literal", "value": str(token)}
+    # --- 新增：负数与 RETURN 语句 ---
 
-    def neg_op(self, items): return {"type": "unary_op", "op": "-", "operand": items[0]}
+    def neg_op(self, items): return {"type": "unary_op", "op": "-", "operand": items[-1]}
 
     def return_stmt(self, items): return {"type": "return"}
 
@@ -31,41 +142,48 @@ class STSemanticAnalyzer(Transformer):
         return "".join(str(i) for i in items if i is not None)
     # --------------------------------------------
 
-    def not_op(self, items): return {"type": "unary_op", "op": "NOT", "operand": items[0]}
-
-    def add(self, items): return self._bin_op("+", items)
-    def sub(self, items): return self._bin_op("-", items)
-    def mul(self, items): return self._bin_op("*", items)
-    def div(self, items): return self._bin_op("/", items)
-    def gt(self, items):  return self._bin_op(">", items)
-    def lt(self, items):  return self._bin_op("<", items)
-    def ge(self, items):  return self._bin_op(">=", items)  # 新增 >=
-    def le(self, items):  return self._bin_op("<=", items)  # 新增 <=
-    def eq(self, items):  return self._bin_op("=", items)
-    def ne(self, items):  return self._bin_op("<>", items)
-    def and_op(self, items): return self._bin_op("AND", items)
-    def or_op(self, items):  return self._bin_op("OR", items)
-
-    def _bin_op(self, op, items):
-        return {
-            "type": "binary_op",
-            "op": op,
-            "left": items[0],
-            "right": items[1]
-        }
+    def not_op(self, items): return {"type": "unary_op", "op": "NOT", "operand": items[-1]}
+
+    # 运算符终结符类型 -> AST 中的 op 字符串 (AND/OR 不区分大小写，统一为大写)
+    _BIN_OPS = {
+        "PLUS": "+", "MINUS": "-", "STAR": "*", "SLASH": "/",
+        "GT": ">", "LT": "<", "GE": ">=", "LE": "<=", "EQ": "=", "NE": "<>",
+        "AND": "AND", "OR": "OR",
+    }
+
+    def _fold_bin_ops(self, items: list) -> dict:
+        """把同一优先级的 [operand, op, operand, op, ...] 折叠为左结合的 binary_op 链"""
+        node = items[0]
+        for i in range(1, len(items), 2):
+            node = {
+                "type": "binary_op",
+                "op": self._BIN_OPS[items[i].type],
+                "left": node,
+                "right": items[i + 1]
+            }
+        return node
+
+    or_expr = and_expr = cmp_expr = add_expr = mul_expr = _fold_bin_ops
 
     def var_decl(self, items):
-        return {
-            "name": items[0],
-            "type": items[1],
-            "init": items[2] if len(items) > 2 else None
-        }
+        return VarDecl(items[0], items[1], items[2] if len(items) > 2 else None)
+
+    def var_block_head(self, items):
+        # 只有带 CONSTANT/RETAIN/PERSISTENT 限定符时才会生成该节点，否则被 ? 内联成单个关键字 Token
+        return items
 
     def var_block(self, items):
-        return {
-            "kind": str(items[0]),
-            "vars": items[1:]
+        # items: [块关键字 Token (或 [关键字, 限定符]), VarDecl..., END_VAR Token]
+        head = items[0]
+        kind, qualifier = (head[0], head[1]) if isinstance(head, list) else (head, None)
+        block = {
+            # 关键字不区分大小写，统一大写后驻留，下游可以按同一个 str 对象分支
+            "kind": sys.intern(kind.value.upper()),
+            "vars": items[1:-1]
         }
+        if qualifier is not None:
+            block["qualifier"] = sys.intern(qualifier.value.upper())
+        return block
 
     def fb_decl(self, items):
         name = items[0]
@@ -109,81 +227,166 @@ class STSemanticAnalyzer(Transformer):
     # ---------------------------------------------------------
     # --- 新增：数据依赖分析 (Data Dependency Analysis) ---
     # ---------------------------------------------------------
-    def get_read_vars(self, node: Any) -> set:
-        if not node: return set()
-        if isinstance(node, list):
-            res = set()
-            for x in node: res |= self.get_read_vars(x)
-            return res
-        if not isinstance(node, dict): return set()
-
-        ntype = node.get("type")
+    def get_read_vars(self, root: Any) -> FrozenSet[str]:
+        # 叶子快路径：单个变量直接返回，None/字符串/字面量等非容器不进入主循环
+        if type(root) is dict:
+            if root.get("type") == "variable":
+                return self._freeze((root["name"],))
+        elif not isinstance(root, (dict, list)):
+            return _EMPTY
+
+        # 构建 DDG 时同一语句/子树会被反复查询：按 id 记忆化，命中的子树直接合并缓存结果
+        cache = self._read_cache
+        hit = cache.get(id(root))
+        if hit is not None:
+            return hit[1]
+
+        # 显式栈代替递归：不为每个节点分配栈帧，深层嵌套的 IF/FOR 也不会触发递归上限
         res = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            hit = cache.get(id(node))
+            if hit is not None:
+                res.update(hit[1])
+                continue
+            # 绝大多数节点是 dict：先用 type() 做精确比较，比 isinstance 更便宜
+            if type(node) is not dict and not isinstance(node, dict):
+                if isinstance(node, list):
+                    stack.extend(node)
+                continue
+
+            ntype = node.get("type")
+
+            # 叶子与特殊结构走快路径，其余节点类型查表得到子节点字段
+            if ntype == "variable":
+                res.add(node["name"])
+                continue
+            if ntype == "func_call":
+                for arg in node.get("arg_list", []):
+                    if isinstance(arg, dict) and "param_name" in arg:
+                        stack.append(arg["expr"])
+                    else:
+                        stack.append(arg)
+                continue
+
+            children = _READ_CHILDREN.get(ntype)
+            if children is None: continue
+            for key in children:
+                stack.append(node.get(key))
+            if ntype == "case_statement":
+                for selection in node.get("selections", []):
+                    stack.append(selection["body"])
 
-        if ntype == "variable":
-            res.add(node["name"])
-        elif ntype == "binary_op":
-            res |= self.get_read_vars(node["left"])
-            res |= self.get_read_vars(node["right"])
-        elif ntype == "unary_op":
-            res |= self.get_read_vars(node["operand"])
-        elif ntype == "assignment":
-            res |= self.get_read_vars(node["expr"])
-            if isinstance(node.get("target_metadata"), dict):
-                res |= self.get_read_vars(node["target_metadata"])
-        elif ntype == "if_statement":
-            res |= self.get_read_vars(node["condition"])
-            res |= self.get_read_vars(node["then_branch"])
-            if node.get("else_branch"):
-                res |= self.get_read_vars(node["else_branch"])
-        elif ntype == "case_statement":
-            res |= self.get_read_vars(node["expression"])
-            for selection in node.get("selections", []):
-                res |= self.get_read_vars(selection["body"])
-            if node.get("else_branch"):
-                res |= self.get_read_vars(node["else_branch"])
-        elif ntype == "for_loop":
-            res |= self.get_read_vars(node["from"])
-            res |= self.get_read_vars(node["to"])
-            res |= self.get_read_vars(node["step"])
-            res |= self.get_read_vars(node["body"])
-        elif ntype == "while_loop":
-            res |= self.get_read_vars(node["condition"])
-            res |= self.get_read_vars(node["body"])
-        elif ntype == "func_call":
-            for arg in node.get("arg_list", []):
-                if isinstance(arg, dict) and "param_name" in arg:
-                    res |= self.get_read_vars(arg["expr"])
-                else:
-                    res |= self.get_read_vars(arg)
+        res = self._freeze(res)
+        cache[id(root)] = (root, res)
         return res
 
-    def get_write_vars(self, node: Any) -> set:
-        if not node: return set()
-        if isinstance(node, list):
-            res = set()
-            for x in node: res |= self.get_write_vars(x)
-            return res
-        if not isinstance(node, dict): return set()
+    def get_rw_vars(self, root: Any) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        一次遍历同时求 (读集合, 写集合)，供重排等需要成对查询的场景使用。
+        与 get_read_vars / get_write_vars 共用缓存；返回缓存里的 frozenset，调用方不要修改。
+        """
+        if not isinstance(root, (dict, list)):
+            return _EMPTY, _EMPTY
+        read_cache, write_cache = self._read_cache, self._write_cache
+        r_hit, w_hit = read_cache.get(id(root)), write_cache.get(id(root))
+        if r_hit is not None and w_hit is not None:
+            return r_hit[1], w_hit[1]
+
+        # 读遍历会经过所有语句块，写操作只来自其中的赋值目标，顺带收集即可
+        reads, writes = set(), set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            r_hit = read_cache.get(id(node))
+            if r_hit is not None:
+                w_hit = write_cache.get(id(node))
+                if w_hit is not None:
+                    reads.update(r_hit[1])
+                    writes.update(w_hit[1])
+                    continue
+            if type(node) is not dict and not isinstance(node, dict):
+                if isinstance(node, list):
+                    stack.extend(node)
+                continue
+
+            ntype = node.get("type")
+            if ntype == "variable":
+                reads.add(node["name"])
+                continue
+            if ntype == "func_call":
+                for arg in node.get("arg_list", []):
+                    if isinstance(arg, dict) and "param_name" in arg:
+                        stack.append(arg["expr"])
+                    else:
+                        stack.append(arg)
+                continue
+            if ntype == "assignment":
+                name = _target_name(node.get("target"))
+                if name is not None:
+                    writes.add(name)
+
+            children = _READ_CHILDREN.get(ntype)
+            if children is None: continue
+            for key in children:
+                stack.append(node.get(key))
+            if ntype == "case_statement":
+                for selection in node.get("selections", []):
+                    stack.append(selection["body"])
+
+        reads, writes = self._freeze(reads), self._freeze(writes)
+        read_cache[id(root)] = (root, reads)
+        write_cache[id(root)] = (root, writes)
+        return reads, writes
+
+    def get_write_vars(self, root: Any) -> FrozenSet[str]:
+        # 与 get_read_vars 一样用显式栈遍历并按 id 记忆化；写操作只可能来自赋值目标，只需进入语句块
+        # 叶子快路径：表达式等不含语句块的节点不可能写入，单条赋值直接取目标，都不进入主循环和缓存
+        if type(root) is dict:
+            ntype = root.get("type")
+            if ntype == "assignment":
+                name = _target_name(root.get("target"))
+                return self._freeze((name,)) if name is not None else _EMPTY
+            if ntype not in _WRITE_CHILDREN:
+                return _EMPTY
+        elif not isinstance(root, (dict, list)):
+            return _EMPTY
+        cache = self._write_cache
+        hit = cache.get(id(root))
+        if hit is not None:
+            return hit[1]
 
-        ntype = node.get("type")
         res = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            hit = cache.get(id(node))
+            if hit is not None:
+                res.update(hit[1])
+                continue
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict): continue
+
+            ntype = node.get("type")
+            if ntype == "assignment":
+                name = _target_name(node.get("target"))
+                if name is not None:
+                    res.add(name)
+                continue
 
-        if ntype == "assignment":
-            target = node.get("target")
-            if isinstance(target, dict) and target.get("type") == "variable":
-                res.add(target.get("name"))
-            elif isinstance(target, str):
-                res.add(target)
-        elif ntype == "if_statement":
-            res |= self.get_write_vars(node.get("then_branch"))
-            res |= self.get_write_vars(node.get("else_branch"))
-        elif ntype == "case_statement":
-            for selection in node.get("selections", []):
-                res |= self.get_write_vars(selection.get("body"))
-            res |= self.get_write_vars(node.get("else_branch"))
-        elif ntype == "for_loop":
-            res |= self.get_write_vars(node.get("body"))
-        elif ntype == "while_loop":
-            res |= self.get_write_vars(node.get("body"))
+            children = _WRITE_CHILDREN.get(ntype)
+            if children is None: continue
+            for key in children:
+                stack.append(node.get(key))
+            if ntype == "case_statement":
+                for selection in node.get("selections", []):
+                    stack.append(selection.get("body"))
+        res = self._freeze(res)
+        cache[id(root)] = (root, res)
         return res
@@ -1,128 +1,249 @@
-from typing import Any
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+# 表达式节点 expr_type -> 其中被读取的子节点字段
+_EXPR_READ_CHILDREN = {
+    "binop": ("left", "right"),
+    "unaryop": ("operand",),
+    "call": ("args",),
+}
+
+# 语句节点 stmt_type -> 其中被读取的子节点字段 (ELSIF / CASE 分支单独展开)
+_STMT_READ_CHILDREN = {
+    "assign": ("value",),  # 赋值语句：右侧 value 全都是被读取的
+    "if": ("cond", "then_body", "else_body"),
+    "case": ("cond", "else_body"),
+    "for": ("start", "end", "step", "body"),
+    "while": ("cond", "body"),
+    "repeat": ("body", "until_cond"),
+    "call": ("args",),
+}
+
+# 语句节点 stmt_type -> 可能包含写操作的子语句块 (条件、表达式里不会产生写入，不必进入)
+_STMT_WRITE_CHILDREN = {
+    "if": ("then_body", "else_body"),
+    "case": ("else_body",),
+    "for": ("body",),
+    "while": ("body",),
+    "repeat": ("body",),
+}
+
+
+# 读/写集合的返回值：空集合共享同一个对象，元素不超过 _POOL_MAX_SIZE 的集合按内容驻留
+_EMPTY: FrozenSet[str] = frozenset()
+_POOL_MAX_SIZE = 4
+
+
+def _target_name(target: Any) -> Optional[str]:
+    """赋值目标中被写入的变量名"""
+    if isinstance(target, dict):
+        return target.get("name") if target.get("expr_type") == "var" else None
+    return target if isinstance(target, str) else None
 
 
 class DependencyAnalyzer:
-    """独立的 AST 数据依赖分析器，用于提取读/写变量集合 (已适配新版 ANTLR 字典结构)"""
-
-    @classmethod
-    def get_read_vars(cls, node: Any) -> set:
-        if not node: return set()
-
-        # 1. 如果是列表（如语句块），递归解析
-        if isinstance(node, list):
-            res = set()
-            for x in node: res |= cls.get_read_vars(x)
-            return res
+    """独立的 AST 数据依赖分析器，用于提取读/写变量集合 (已适配新版 ANTLR 字典结构)
+
+    两个遍历都用显式栈代替递归，深层嵌套的 IF/CASE/FOR 不会触发递归上限。
+    """
+
+    def __init__(self):
+        # 重排语句时同一语句会被反复查询：按 id 记忆化 -> (node, 变量集合)
+        # 同时持有 node 引用，保证缓存存活期间其 id 不会被新对象复用
+        self._read_cache: dict = {}
+        self._write_cache: dict = {}
+        self._fs_pool: Dict[FrozenSet[str], FrozenSet[str]] = {}
+
+    def reset_cache(self):
+        """清空读/写集合缓存，在处理相互独立的工程之间、或原地修改过 AST 之后调用"""
+        self._read_cache.clear()
+        self._write_cache.clear()
+        self._fs_pool.clear()
+
+    def _freeze(self, names) -> FrozenSet[str]:
+        """结果统一为不可变 frozenset，调用方可直接共享缓存值；小集合按内容去重，相同读/写集合只保留一份"""
+        res = frozenset(names)
+        if not res:
+            return _EMPTY
+        if len(res) <= _POOL_MAX_SIZE:
+            res = self._fs_pool.setdefault(res, res)
+        return res
 
-        if not isinstance(node, dict): return set()
+    def get_read_vars(self, root: Any) -> FrozenSet[str]:
+        if not isinstance(root, (dict, list)): return _EMPTY
+        cache = self._read_cache
+        hit = cache.get(id(root))
+        if hit is not None:
+            return hit[1]
 
         res = set()
-
-        # 处理顶层 POU (PROGRAM / FUNCTION_BLOCK)
-        if "unit_type" in node:
-            res |= cls.get_read_vars(node.get("body", []))
-
-        # --- 处理表达式 (expr_type) ---
-        expr_type = node.get("expr_type")
-        if expr_type == "var":
-            res.add(node.get("name"))
-        elif expr_type == "binop":
-            res |= cls.get_read_vars(node.get("left"))
-            res |= cls.get_read_vars(node.get("right"))
-        elif expr_type == "unaryop":
-            res |= cls.get_read_vars(node.get("operand"))
-        elif expr_type == "call":
-            for arg in node.get("args", []):
-                res |= cls.get_read_vars(arg)
-
-        # --- 处理语句 (stmt_type) ---
-        stmt_type = node.get("stmt_type")
-        if stmt_type == "assign":
-            # 赋值语句：右侧 value 全都是被读取的
-            res |= cls.get_read_vars(node.get("value"))
-
-        elif stmt_type == "if":
-            res |= cls.get_read_vars(node.get("cond"))
-            res |= cls.get_read_vars(node.get("then_body"))
-            # 遍历 ELSIF 里的条件和分支
-            for elif_b in node.get("elif_branches", []):
-                res |= cls.get_read_vars(elif_b.get("cond"))
-                res |= cls.get_read_vars(elif_b.get("then_body"))
-            res |= cls.get_read_vars(node.get("else_body"))
-
-        elif stmt_type == "case":
-            res |= cls.get_read_vars(node.get("cond"))
-            for entry in node.get("entries", []):
-                res |= cls.get_read_vars(entry.get("body"))
-            res |= cls.get_read_vars(node.get("else_body"))
-
-        elif stmt_type == "for":
-            res |= cls.get_read_vars(node.get("start"))
-            res |= cls.get_read_vars(node.get("end"))
-            res |= cls.get_read_vars(node.get("step"))
-            res |= cls.get_read_vars(node.get("body"))
-
-        elif stmt_type == "while":
-            res |= cls.get_read_vars(node.get("cond"))
-            res |= cls.get_read_vars(node.get("body"))
-
-        elif stmt_type == "repeat":
-            res |= cls.get_read_vars(node.get("body"))
-            res |= cls.get_read_vars(node.get("until_cond"))
-
-        elif stmt_type == "call":
-            for arg in node.get("args", []):
-                res |= cls.get_read_vars(arg)
-
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            # 已缓存的子树直接合并结果
+            hit = cache.get(id(node))
+            if hit is not None:
+                res.update(hit[1])
+                continue
+
+            # 1. 如果是列表（如语句块），平铺入栈
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict): continue
+
+            # 处理顶层 POU (PROGRAM / FUNCTION_BLOCK)
+            if "unit_type" in node:
+                stack.append(node.get("body", []))
+
+            # --- 处理表达式 (expr_type) ---
+            expr_type = node.get("expr_type")
+            if expr_type == "var":
+                res.add(node.get("name"))
+            else:
+                for key in _EXPR_READ_CHILDREN.get(expr_type, ()):
+                    stack.append(node.get(key))
+
+            # --- 处理语句 (stmt_type) ---
+            # 调用节点同时带 expr_type/stmt_type == "call"，参数已在上面入栈，不再重复
+            stmt_type = node.get("stmt_type")
+            if stmt_type is None or stmt_type == expr_type: continue
+            for key in _STMT_READ_CHILDREN.get(stmt_type, ()):
+                stack.append(node.get(key))
+            if stmt_type == "if":
+                # 遍历 ELSIF 里的条件和分支
+                for elif_b in node.get("elif_branches", []):
+                    stack.append(elif_b.get("cond"))
+                    stack.append(elif_b.get("then_body"))
+            elif stmt_type == "case":
+                for entry in node.get("entries", []):
+                    stack.append(entry.get("body"))
+
+        res = self._freeze(res)
+        cache[id(root)] = (root, res)
         return res
 
-    @classmethod
-    def get_write_vars(cls, node: Any) -> set:
-        if not node: return set()
-
-        if isinstance(node, list):
-            res = set()
-            for x in node: res |= cls.get_write_vars(x)
-            return res
-
-        if not isinstance(node, dict): return set()
+    def get_rw_vars(self, root: Any) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        一次遍历同时求 (读集合, 写集合)，供重排等需要成对查询的场景使用。
+        与 get_read_vars / get_write_vars 共用缓存；返回缓存里的 frozenset，调用方不要修改。
+        """
+        if not isinstance(root, (dict, list)):
+            return _EMPTY, _EMPTY
+        read_cache, write_cache = self._read_cache, self._write_cache
+        r_hit, w_hit = read_cache.get(id(root)), write_cache.get(id(root))
+        if r_hit is not None and w_hit is not None:
+            return r_hit[1], w_hit[1]
+
+        # 读遍历会经过所有语句块，写操作只来自其中的赋值目标与 FOR 计数器，顺带收集即可
+        reads, writes = set(), set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            r_hit = read_cache.get(id(node))
+            if r_hit is not None:
+                w_hit = write_cache.get(id(node))
+                if w_hit is not None:
+                    reads.update(r_hit[1])
+                    writes.update(w_hit[1])
+                    continue
+
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict): continue
+
+            if "unit_type" in node:
+                stack.append(node.get("body", []))
+
+            expr_type = node.get("expr_type")
+            if expr_type == "var":
+                reads.add(node.get("name"))
+            else:
+                for key in _EXPR_READ_CHILDREN.get(expr_type, ()):
+                    stack.append(node.get(key))
+
+            stmt_type = node.get("stmt_type")
+            if stmt_type is None or stmt_type == expr_type: continue
+            if stmt_type == "assign":
+                name = _target_name(node.get("target"))
+                if name is not None:
+                    writes.add(name)
+            elif stmt_type == "for":
+                writes.add(node.get("var"))
+            for key in _STMT_READ_CHILDREN.get(stmt_type, ()):
+                stack.append(node.get(key))
+            if stmt_type == "if":
+                for elif_b in node.get("elif_branches", []):
+                    stack.append(elif_b.get("cond"))
+                    stack.append(elif_b.get("then_body"))
+            elif stmt_type == "case":
+                for entry in node.get("entries", []):
+                    stack.append(entry.get("body"))
+
+        reads, writes = self._freeze(reads), self._freeze(writes)
+        read_cache[id(root)] = (root, reads)
+        write_cache[id(root)] = (root, writes)
+        return reads, writes
+
+    def get_write_vars(self, root: Any) -> FrozenSet[str]:
+        # 叶子快路径：表达式等不含语句块的节点不可能写入，单条赋值直接取目标，都不进入主循环和缓存
+        if type(root) is dict and "unit_type" not in root:
+            stmt_type = root.get("stmt_type")
+            if stmt_type == "assign":
+                name = _target_name(root.get("target"))
+                return self._freeze((name,)) if name is not None else _EMPTY
+            if stmt_type not in _STMT_WRITE_CHILDREN:
+                return _EMPTY
+        elif not isinstance(root, (dict, list)):
+            return _EMPTY
+        cache = self._write_cache
+        hit = cache.get(id(root))
+        if hit is not None:
+            return hit[1]
 
         res = set()
-
-        # 处理顶层 POU
-        if "unit_type" in node:
-            res |= cls.get_write_vars(node.get("body", []))
-
-        stmt_type = node.get("stmt_type")
-
-        if stmt_type == "assign":
-            # 提取左侧被写入的变量
-            target = node.get("target")
-            if isinstance(target, dict) and target.get("expr_type") == "var":
-                res.add(target.get("name"))
-            elif isinstance(target, str):
-                res.add(target)
-
-        elif stmt_type == "for":
-            # 🚨 重点：FOR 循环的计数器本身也是被写入的变量！
-            res.add(node.get("var"))
-            res |= cls.get_write_vars(node.get("body"))
-
-        elif stmt_type == "if":
-            res |= cls.get_write_vars(node.get("then_body"))
-            for elif_b in node.get("elif_branches", []):
-                res |= cls.get_write_vars(elif_b.get("then_body"))
-            res |= cls.get_write_vars(node.get("else_body"))
-
-        elif stmt_type == "case":
-            for entry in node.get("entries", []):
-                res |= cls.get_write_vars(entry.get("body"))
-            res |= cls.get_write_vars(node.get("else_body"))
-
-        elif stmt_type == "while":
-            res |= cls.get_write_vars(node.get("body"))
-
-        elif stmt_type == "repeat":
-            res |= cls.get_write_vars(node.get("body"))
-
-        return res
\ No newline at end of file
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node: continue
+            hit = cache.get(id(node))
+            if hit is not None:
+                res.update(hit[1])
+                continue
+
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict): continue
+
+            # 处理顶层 POU
+            if "unit_type" in node:
+                stack.append(node.get("body", []))
+
+            stmt_type = node.get("stmt_type")
+
+            if stmt_type == "assign":
+                # 提取左侧被写入的变量
+                name = _target_name(node.get("target"))
+                if name is not None:
+                    res.add(name)
+                continue
+
+            if stmt_type == "for":
+                # 🚨 重点：FOR 循环的计数器本身也是被写入的变量！
+                res.add(node.get("var"))
+
+            for key in _STMT_WRITE_CHILDREN.get(stmt_type, ()):
+                stack.append(node.get(key))
+            if stmt_type == "if":
+                for elif_b in node.get("elif_branches", []):
+                    stack.append(elif_b.get("then_body"))
+            elif stmt_type == "case":
+                for entry in node.get("entries", []):
+                    stack.append(entry.get("body"))
+
+        res = self._freeze(res)
+        cache[id(root)] = (root, res)
+        return res
@@ -1,6 +1,10 @@
-import copy
-import json
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Optional, Tuple
 
 from tqdm import tqdm
 
@@ -8,21 +12,35 @@ from ..stparser import STParser
 from ..stanalyzer import DependencyAnalyzer
 from ..stunparser.unparser import STUnparser
 from ..strewriter import STRewriter
+from ..stvailder.result_cache import ResultCache
 from ..utils import auto_repair
+from ..utils_files import scan_files
+from .. import utils_json
 
 
 class DataAugmenter:
-    def __init__(self, input_dir: str, output_dir: str, ext: str = ".json", num_variants: int = 2):
+    def __init__(self, input_dir: str, output_dir: str, ext: str = ".json", num_variants: int = 2,
+                 files: Optional[Iterable] = None, workers: Optional[int] = None, pretty: bool = False):
+        """
+        :param workers: 并行处理文件的进程数，默认 CPU 核数；1 表示在当前进程内串行处理
+        :param pretty: 输出按 2 空格缩进；默认紧凑格式，体积约小一半，数据集加载更快
+        """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.ext = ext
         self.num_variants = num_variants
+        self.workers = workers
+        self.pretty = pretty
+        # 调用方已扫描好的文件列表，给出时 run() 不再重新扫描目录
+        self.files = None if files is None else [Path(f) for f in files]
 
         # 初始化核心引擎
         self.parser = STParser()
         self.analyzer = DependencyAnalyzer()
         self.rewriter = STRewriter(analyzer=self.analyzer, mode="augment")
         self.unparser = STUnparser()
+        # 代码摘要 -> 解析结果快照：数据集里重复的 output 不再重复解析
+        self._asts = ResultCache(8192)
 
         # 批处理统计
         self.stats = {
@@ -36,8 +54,9 @@ class DataAugmenter:
     def process_single_file(self, file_path: Path) -> list:
         """处理单个 JSON 文件，返回包含了原数据和增强数据的混合列表"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                dataset = json.load(f)
+            # 二进制打开交给 utils_json.load：装有 orjson 时 mmap 映射后直接解析，不再整文件解码成 str
+            with open(file_path, 'rb') as f:
+                dataset = utils_json.load(f)
         except Exception as e:
             print(f"\n⚠️ 警告: 文件读取失败 -> {file_path.name}: {e}")
             return []
@@ -63,28 +82,27 @@ class DataAugmenter:
                 continue
 
             # 2. 尝试解析成 AST
-            parse_res = self.parser.get_ast(repaired_code)
-            if parse_res.get("status") != "success":
+            snapshot = self._parse_snapshot(repaired_code)
+            if snapshot == b"":
                 self.stats["parse_errors"] += 1
                 continue
-
-            original_ast = parse_res["ast"]
+            if not isinstance(snapshot, bytes):
+                original_ast, snapshot = snapshot, None
 
             # 3. 循环生成 N 个变体
             for _ in range(self.num_variants):
                 try:
-                    # 深拷贝防止污染
-                    ast_clone = copy.deepcopy(original_ast)
-
-                    # 变异与反解析
-                    mutated_ast = self.rewriter.rewrite(ast_clone)
+                    # 变异与反解析 (每次都在副本上原地重写，原始 AST 留给下一个变体)
+                    if snapshot is not None:
+                        mutated_ast = self.rewriter.rewrite(pickle.loads(snapshot))
+                    else:
+                        mutated_ast = self.rewriter.copy_tree(original_ast)
                     new_code = self.unparser.unparse(mutated_ast)
 
                     # 确认代码发生了实际变化 (防重复)
                     if new_code.strip() and new_code.strip() != original_code.strip():
-                        new_item = copy.deepcopy(item)
-                        new_item["output"] = new_code
-                        new_item["is_augmented"] = True  # 打上 AI 增强标记
+                        # 样本写出前不会再被修改，浅拷贝即可，嵌套字段与原样本共享
+                        new_item = {**item, "output": new_code, "is_augmented": True}  # 打上 AI 增强标记
                         augmented_dataset.append(new_item)
                         self.stats["total_augmented"] += 1
                 except Exception:
@@ -93,9 +111,32 @@ class DataAugmenter:
 
         return augmented_dataset
 
+    def _parse_snapshot(self, code: str):
+        """
+        解析代码并返回 AST 的 pickle 快照，按代码摘要缓存。
+        每个变体从快照 pickle.loads 出一份新树 (比逐次深拷贝快数倍，别名关系照样保留)。
+        解析失败返回 b""；嵌套过深等无法 pickle 的情况直接返回 AST 本身 (之后走 copy_tree，原树不会被修改)。
+        """
+        key = self._asts.key(code)
+        snapshot = self._asts.get(key)
+        if snapshot is None:
+            parse_res = self.parser.get_ast(code)
+            if parse_res.get("status") != "success":
+                snapshot = b""
+            else:
+                try:
+                    snapshot = pickle.dumps(parse_res["ast"], protocol=pickle.HIGHEST_PROTOCOL)
+                except Exception:
+                    snapshot = parse_res["ast"]
+            self._asts.put(key, snapshot)
+        return snapshot
+
     def run(self):
         """执行批量增强流程"""
-        files = list(self.input_dir.rglob(f"*{self.ext}"))
+        if self.files is not None:
+            files = self.files
+        else:
+            files = [Path(p) for p in scan_files(str(self.input_dir), self.ext)]
         self.stats["total_files"] = len(files)
 
         if not files:
@@ -104,9 +145,7 @@ class DataAugmenter:
 
         print(f"🚀 发现 {len(files)} 个文件，启动 AST 批量增强工厂 (裂变系数: x{self.num_variants})...")
 
-        for file_path in tqdm(files, desc="Augmenting Datasets"):
-            augmented_data = self.process_single_file(file_path)
-
+        for file_path, augmented_data in tqdm(self._process_files(files), total=len(files), desc="Augmenting Datasets"):
             if not augmented_data:
                 continue
 
@@ -119,11 +158,31 @@ class DataAugmenter:
 
             # 将增强后的数据存入该专属文件夹
             out_file = file_out_dir / "augmented_golden.json"
-            with open(out_file, 'w', encoding='utf-8') as f:
-                json.dump(augmented_data, f, ensure_ascii=False, indent=2)
+            # utils_json 在装有 orjson 时走 C 实现序列化
+            with open(out_file, 'wb') as f:
+                utils_json.write_array(f, augmented_data, indent=self.pretty)
 
         self.print_report()
 
+    def _process_files(self, files: list):
+        """
+        逐个产出 (文件路径, 增强结果)，顺序与 files 一致。
+        文件之间相互独立，解析/重写/反解析都是纯 Python 的 CPU 密集任务，多个文件时用进程池；
+        每个工作进程在 initializer 里构建一次自己的 DataAugmenter，统计增量随结果带回主进程汇总。
+        """
+        if self.workers == 1 or len(files) < 2:
+            for file_path in files:
+                yield file_path, self.process_single_file(file_path)
+            return
+
+        config = dict(input_dir=str(self.input_dir), output_dir=str(self.output_dir),
+                      ext=self.ext, num_variants=self.num_variants, workers=1)
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(config,)) as executor:
+            for file_path, (augmented_data, stats) in zip(files, executor.map(_augment_in_worker, files)):
+                for key in _SAMPLE_STATS:
+                    self.stats[key] += stats[key]
+                yield file_path, augmented_data
+
     def print_report(self):
         """打印炫酷的流水线战报"""
         orig = self.stats["total_original"]
@@ -143,3 +202,26 @@ class DataAugmenter:
         print(f"📦 最终数据总量: {total:6d} 条")
         print(f"📁 结果已按原文件名分发至: {self.output_dir.absolute()}")
         print("=" * 55)
+
+
+# ==========================================
+# run() 的进程池任务 (必须是模块级函数才能被 pickle)
+# ==========================================
+# process_single_file 按样本累加的统计项，工作进程按文件把增量带回主进程
+_SAMPLE_STATS = ("total_original", "total_augmented", "parse_errors")
+_WORKER_AUGMENTER: Optional[DataAugmenter] = None
+
+
+def _init_worker(config: dict) -> None:
+    global _WORKER_AUGMENTER
+    _WORKER_AUGMENTER = DataAugmenter(**config)
+    # fork 出的子进程继承父进程的随机数状态，不重新播种的话各进程会生成完全相同的变体
+    random.seed(os.getpid() ^ time.time_ns())
+
+
+def _augment_in_worker(file_path: Path) -> Tuple[list, dict]:
+    stats = _WORKER_AUGMENTER.stats
+    for key in _SAMPLE_STATS:
+        stats[key] = 0
+    augmented_data = _WORKER_AUGMENTER.process_single_file(file_path)
+    return augmented_data, {key: stats[key] for key in _SAMPLE_STATS}
@@ -1,20 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple, List, Dict
-import json
+from typing import Tuple, List, Dict, Iterable, Optional
 from tqdm import tqdm
 
 from ..stvailder import STValidator
 from ..stvailder import MatiecValidator
 from ..stvailder import FastValidator
 from ..utils import auto_repair
+from ..utils_files import scan_files
+from .. import utils_json
 
 
 class STDataCleaner:
-    def __init__(self, input_dir: str, output_dir: str, iec2c_path: str = "iec2c", st_lib_path: str="lib", use_matiec: bool=False,ext: str = ".json"):
+    def __init__(self, input_dir: str, output_dir: str, iec2c_path: str = "iec2c", st_lib_path: str="lib", use_matiec: bool=False,ext: str = ".json",
+                 workers: Optional[int] = None, files: Optional[Iterable] = None, pretty: bool = False):
+        """
+        :param workers: 并行处理文件的进程数，默认 CPU 核数；1 表示在当前进程内串行处理
+        :param files: 调用方已扫描好的文件列表，给出时 run() 不再重新扫描目录
+        :param pretty: 输出按 2 空格缩进；默认紧凑格式，体积约小一半，数据集加载更快
+        """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.ext = ext
         self.use_matiec = use_matiec
+        self.workers = workers
+        self.pretty = pretty
+        self.files = None if files is None else [Path(f) for f in files]
 
         # 初始化漏斗组件
         self.fast_validator = FastValidator()
@@ -32,8 +43,9 @@ class STDataCleaner:
 
     def process_single_file(self, file_path: Path) -> Dict[str, List[Dict]]:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 二进制打开交给 utils_json.load：装有 orjson 时 mmap 映射后直接解析，不再整文件解码成 str
+            with open(file_path, 'rb') as f:
+                data = utils_json.load(f)
         except Exception:
             return {}
         if not isinstance(data, list): return {}
@@ -66,7 +78,7 @@ class STDataCleaner:
                     if self.use_matiec:
                         is_valid_s2, msg2 = self.matiec_validator.validate(repaired_code)
                     else:
-                        is_valid_s2, msg2 = self.validator.validate_v2(repaired_code)
+                        is_valid_s2, msg2 = self.validator.validate(repaired_code)
                     if not is_valid_s2:
                         status = "syntax_error"
                         error_reason = msg2
@@ -78,7 +90,10 @@ class STDataCleaner:
         return categorized_data
 
     def run(self):
-        files = list(self.input_dir.rglob(f"*{self.ext}"))
+        if self.files is not None:
+            files = self.files
+        else:
+            files = [Path(p) for p in scan_files(str(self.input_dir), self.ext)]
         self.stats["total_files"] = len(files)
         if not files: return
         if self.use_matiec:
@@ -86,8 +101,7 @@ class STDataCleaner:
         else:
             print(f"🚀 发现 {len(files)} 个文件，启动 Anltr4 级联清洗...")
 
-        for file_path in tqdm(files, desc="Compiling & Validating"):
-            categorized_data = self.process_single_file(file_path)
+        for file_path, categorized_data in tqdm(self._process_files(files), total=len(files), desc="Compiling & Validating"):
             if not categorized_data: continue
             self.stats["processed_files"] += 1
 
@@ -97,11 +111,31 @@ class STDataCleaner:
             for status, items in categorized_data.items():
                 if items:
                     out_file = file_out_dir / f"{status}.json"
-                    with open(out_file, 'w', encoding='utf-8') as f:
-                        json.dump(items, f, ensure_ascii=False, indent=2)
+                    with open(out_file, 'wb') as f:
+                        utils_json.write_array(f, items, indent=self.pretty)
 
         self.print_report()
 
+    def _process_files(self, files: list):
+        """
+        逐个产出 (文件路径, 分类结果)，顺序与 files 一致。
+        多个文件时用进程池并行：每个工作进程在 initializer 里构建一次自己的 STDataCleaner
+        (含各自的校验器与 iec2c 工作目录)，统计增量随结果带回主进程汇总。
+        """
+        if self.workers == 1 or len(files) < 2:
+            for file_path in files:
+                yield file_path, self.process_single_file(file_path)
+            return
+
+        config = dict(input_dir=str(self.input_dir), output_dir=str(self.output_dir),
+                      iec2c_path=self.matiec_validator.iec2c_path, st_lib_path=self.matiec_validator.st_lib_path,
+                      use_matiec=self.use_matiec, ext=self.ext, workers=1)
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(config,)) as executor:
+            for file_path, (categorized_data, stats) in zip(files, executor.map(_clean_in_worker, files)):
+                for key in _SAMPLE_STATS:
+                    self.stats[key] += stats[key]
+                yield file_path, categorized_data
+
     def print_report(self):
         t = self.stats["total_samples"]
         g, me, be, e = self.stats["golden"], self.stats["syntax_error"], self.stats["basic_error"], self.stats["empty"]
@@ -119,4 +153,25 @@ class STDataCleaner:
             print(f"🗑️ Empty (无效废弃数据):                {e:6d} ({(e / t * 100):.2f}%)")
         print("-" * 60)
         print(f"📁 结果已分类存放至: {self.output_dir.absolute()}")
-        print("=" * 60)
\ No newline at end of file
+        print("=" * 60)
+
+
+# ==========================================
+# run() 的进程池任务 (必须是模块级函数才能被 pickle)
+# ==========================================
+# process_single_file 按样本累加的统计项，工作进程按文件把增量带回主进程
+_SAMPLE_STATS = ("total_samples", "golden", "syntax_error", "basic_error", "empty")
+_WORKER_CLEANER: Optional[STDataCleaner] = None
+
+
+def _init_worker(config: dict) -> None:
+    global _WORKER_CLEANER
+    _WORKER_CLEANER = STDataCleaner(**config)
+
+
+def _clean_in_worker(file_path: Path) -> Tuple[Dict[str, List[Dict]], dict]:
+    stats = _WORKER_CLEANER.stats
+    for key in _SAMPLE_STATS:
+        stats[key] = 0
+    categorized_data = _WORKER_CLEANER.process_single_file(file_path)
+    return categorized_data, {key: stats[key] for key in _SAMPLE_STATS}
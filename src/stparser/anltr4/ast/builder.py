@@ -537,80 +537,38 @@ class ASTBuilder(IEC61131ParserVisitor):
     def visitParenExpr(self, ctx: IEC61131Parser.ParenExprContext) -> Expr:
         return self.visit(ctx.sub)
 
-    # binaryPowerExpr : left=expression op=POWER right=expression
-    def visitBinaryPowerExpr(
-            self, ctx: IEC61131Parser.BinaryPowerExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryModDivExpr : <assoc=right> left=expression op=(MOD|DIV) right=expression
-    def visitBinaryModDivExpr(
-            self, ctx: IEC61131Parser.BinaryModDivExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryMultExpr : left=expression op=MULT right=expression
-    def visitBinaryMultExpr(
-            self, ctx: IEC61131Parser.BinaryMultExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryPlusMinusExpr : left=expression op=(PLUS|MINUS) right=expression
-    def visitBinaryPlusMinusExpr(
-            self, ctx: IEC61131Parser.BinaryPlusMinusExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryCmpExpr : left=expression op=(<,>,<=,>=) right=expression
-    def visitBinaryCmpExpr(
-            self, ctx: IEC61131Parser.BinaryCmpExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryEqExpr : left=expression op=(=,<>) right=expression
-    def visitBinaryEqExpr(
-            self, ctx: IEC61131Parser.BinaryEqExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryAndExpr : left=expression op=(AND|AMPERSAND) right=expression
-    def visitBinaryAndExpr(
-            self, ctx: IEC61131Parser.BinaryAndExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryOrExpr : left=expression op=OR right=expression
-    def visitBinaryOrExpr(
-            self, ctx: IEC61131Parser.BinaryOrExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # binaryXORExpr : left=expression op=XOR right=expression
-    def visitBinaryXORExpr(
-            self, ctx: IEC61131Parser.BinaryXORExprContext
-    ) -> Expr:
-        return self._make_binop(ctx)
-
-    # primaryExpr : primary_expression
-    def visitPrimaryExpr(
-            self, ctx: IEC61131Parser.PrimaryExprContext
-    ) -> Expr:
-        return self.visit(ctx.primary_expression())
-
     def _make_binop(self, ctx) -> BinOp:
         """
         通用二元运算构造，ctx 需要有 left / right / op 三个属性。
         """
-        left = self.visit(ctx.left)
-        right = self.visit(ctx.right)
-        op_text = ctx.op.text
         return BinOp(
-            op=op_text,
-            left=left,
-            right=right,
+            op=ctx.op.text,
+            left=self.visit(ctx.left),
+            right=self.visit(ctx.right),
             loc=self._loc(ctx),
         )
 
+    # 所有二元运算备选 (left=expression op=... right=expression) 的构造方式完全相同，
+    # 直接把 visit 方法绑定到 _make_binop，ctx.accept() 分发时少一层转发调用：
+    #   binaryPowerExpr     : op=POWER
+    #   binaryModDivExpr    : <assoc=right> op=(MOD|DIV)
+    #   binaryMultExpr      : op=MULT
+    #   binaryPlusMinusExpr : op=(PLUS|MINUS)
+    #   binaryCmpExpr       : op=(<,>,<=,>=)
+    #   binaryEqExpr        : op=(=,<>)
+    #   binaryAndExpr       : op=(AND|AMPERSAND)
+    #   binaryOrExpr        : op=OR
+    #   binaryXORExpr       : op=XOR
+    visitBinaryPowerExpr = visitBinaryModDivExpr = visitBinaryMultExpr = _make_binop
+    visitBinaryPlusMinusExpr = visitBinaryCmpExpr = visitBinaryEqExpr = _make_binop
+    visitBinaryAndExpr = visitBinaryOrExpr = visitBinaryXORExpr = _make_binop
+
+    # primaryExpr : primary_expression
+    def visitPrimaryExpr(
+            self, ctx: IEC61131Parser.PrimaryExprContext
+    ) -> Expr:
+        return self.visit(ctx.primary_expression())
+
     # ========= primary_expression / constant / variable =========
 
     def visitPrimary_expression(
@@ -1,49 +1,55 @@
 from __future__ import annotations
+import sys
 from dataclasses import dataclass, field
 from typing import List, Optional, Any, Tuple
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class SourceLocation:
     file: str
     line: int
     column: int = 0
 
 
+# 所有节点都是 slots dataclass：工程级 AST 节点数量巨大，省掉每个实例的 __dict__，
+# 内存更小且字段访问是固定偏移而非哈希查找
+
 # ===== Expressions =====
 
 class Expr:
+    # 基类也声明空 __slots__，子类实例才不会再带 __dict__
+    __slots__ = ()
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class VarRef(Expr):
     name: str
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class ArrayAccess(Expr):
     base: Expr           # 通常是 VarRef 或 FieldAccess
     index: Expr          # 下标表达式，可是常量/变量/算式
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class FieldAccess(Expr):
     base: Expr           # 通常是 VarRef 或 ArrayAccess
     field: str           # 字段名，比如 "Pos" / "Status"
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Literal(Expr):
     value: Any
     type: str
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class BinOp(Expr):
     op: str
     left: Expr
@@ -51,7 +57,7 @@ class BinOp(Expr):
     loc: SourceLocation
 
 #新增：函数/FB 调用表达式
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class CallExpr(Expr):
     func: str              # 函数/FB 名字，例如 "Motion_Delta_S"
     args: List[Expr]       # 实际参数表达式列表
@@ -61,17 +67,18 @@ class CallExpr(Expr):
 # ===== Statements =====
 
 class Stmt:
+    __slots__ = ()
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Assignment(Stmt):
     target: Expr
     value: Expr
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class IfStmt(Stmt):
     cond: Expr
     then_body: List[Stmt]
@@ -80,7 +87,7 @@ class IfStmt(Stmt):
     loc: SourceLocation = None
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class ForStmt(Stmt):
     var: str
     start: Expr
@@ -90,27 +97,27 @@ class ForStmt(Stmt):
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class CallStmt(Stmt):
     fb_name: str
     args: List[Expr]
     loc: SourceLocation
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class WhileStmt(Stmt):
     cond: Expr
     body: List[Stmt]
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class RepeatStmt(Stmt):
     body: List[Stmt]
     until: Expr
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class CaseCond:
     """
     CASE 分支条件：直接保留语法原文（支持 1 / 1..5 / cast / IDENTIFIER 等）
@@ -119,7 +126,7 @@ class CaseCond:
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class CaseEntry:
     """
     CASE 的一个分支：
@@ -131,7 +138,7 @@ class CaseEntry:
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class CaseStmt(Stmt):
     """
     CASE cond OF
@@ -145,7 +152,7 @@ class CaseStmt(Stmt):
 
 # ===== POU / Program units =====
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class VarDecl:
     name: str
     type: str
@@ -154,7 +161,7 @@ class VarDecl:
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class ProgramDecl:
     name: str
     vars: List[VarDecl]
@@ -162,7 +169,7 @@ class ProgramDecl:
     loc: SourceLocation
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class FBDecl:
     name: str
     vars: List[VarDecl]
@@ -261,7 +268,7 @@ def ast_to_dict(node: Any) -> Any:
         result["stmt_type"] = "call"
         result["expr_type"] = "call"
         result["type"] = "func_call"
-        result["func_name"] = name
+        result["func_name"] = sys.intern(name)
         result["args"] = args  # 对齐 STUnparser
         result["arg_list"] = args  # 对齐 DependencyAnalyzer
 
@@ -269,7 +276,9 @@ def ast_to_dict(node: Any) -> Any:
     elif isinstance(node, VarRef):
         result["expr_type"] = "var"
         result["type"] = "variable"
-        result["name"] = node.name
+        # 变量名在依赖分析里反复做集合运算，驻留后同名变量共享同一个 str 对象，哈希/比较走指针快路径
+        # (字典键与 "var" 这类字面量由编译器自动驻留，无需处理)
+        result["name"] = sys.intern(node.name)
 
     elif isinstance(node, Literal):
         result["expr_type"] = "literal"
@@ -288,7 +297,7 @@ def ast_to_dict(node: Any) -> Any:
         # 旧版通常将这些平铺为字符串，为了兼容，我们提供一个文本表达
         result["expr_type"] = "var"
         result["type"] = "variable"
-        result["name"] = _flatten_access(node)
+        result["name"] = sys.intern(_flatten_access(node))
 
     return result
 
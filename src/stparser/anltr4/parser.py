@@ -27,6 +27,15 @@ class STErrorListener(ErrorListener):
 # 3. 封装的 STParser 主类 (适配你的 pytest)
 # ---------------------------------------------------------
 class STParser:
+    def __init__(self):
+        # 词法/语法分析器实例在同一个 STParser 上复用：每次解析只替换输入流，
+        # 不再重复构造 ATN 模拟器，Lexer 的 PredictionContextCache 也能跨文件积累
+        self._lexer = IEC61131Lexer(None)
+        self._parser = IEC61131Parser(None)
+        self._parser.removeErrorListeners()
+        self._error_listener = STErrorListener()
+        self._parser.addErrorListener(self._error_listener)
+
     def preprocess_st(self, code: str) -> str:
         # 在这里放入你的预处理逻辑（如转大写、去特殊注释等）
         code = auto_repair(code)
@@ -36,15 +45,14 @@ class STParser:
         try:
             code = self.preprocess_st(code)
 
-            input_stream = InputStream(code)
-            lexer = IEC61131Lexer(input_stream)
-            token_stream = CommonTokenStream(lexer)
-            parser = IEC61131Parser(token_stream)
+            lexer = self._lexer
+            lexer.inputStream = InputStream(code)
+            parser = self._parser
+            parser.setTokenStream(CommonTokenStream(lexer))
 
-            # 替换默认的错误监听器，防止它只在控制台打印而不抛出异常
-            parser.removeErrorListeners()
-            error_listener = STErrorListener()
-            parser.addErrorListener(error_listener)
+            # 默认错误监听器已在 __init__ 中替换，防止它只在控制台打印而不抛出异常
+            error_listener = self._error_listener
+            error_listener.errors.clear()
 
             # 1. 生成 Parse Tree
             tree = parser.start()
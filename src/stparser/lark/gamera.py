@@ -55,25 +55,19 @@ ST_GRAMMAR = r"""
     formal_param_list: formal_param ("," formal_param)*
     formal_param: IDENT ":=" expr
 
-    ?expr: term
-         | expr "+" term   -> add
-         | expr "-" term   -> sub
-         | expr ">" term   -> gt
-         | expr "<" term   -> lt
-         | expr ">=" term  -> ge
-         | expr "<=" term  -> le
-         | expr "=" term   -> eq
-         | expr "<>" term  -> ne
-         | expr AND term -> and_op
-         | expr OR term  -> or_op
-
-    ?term: factor
-         | term "*" factor -> mul
-         | term "/" factor -> div
-
-    ?factor: NUMBER        -> num
-           | ST_LITERAL    -> literal
-           | "-" factor    -> neg_op
+    # 按优先级分层 (OR < AND < 比较 < 加减 < 乘除)，每层一次归约折叠整串同级运算，
+    # 而不是每个二元运算符一次归约
+    ?expr: or_expr
+    ?or_expr: and_expr (OR and_expr)*
+    ?and_expr: cmp_expr (AND cmp_expr)*
+    ?cmp_expr: add_expr ((GE | LE | NE | GT | LT | EQ) add_expr)*
+    ?add_expr: mul_expr ((PLUS | MINUS) mul_expr)*
+    ?mul_expr: factor ((STAR | SLASH) factor)*
+
+    # NUMBER / ST_LITERAL 由分析器的终结符回调直接生成字面量节点，不再经过一层 num/literal 规则归约
+    ?factor: NUMBER
+           | ST_LITERAL
+           | MINUS factor  -> neg_op
            | IDENT         -> var
            | "(" expr ")"
            | NOT factor    -> not_op
@@ -130,12 +124,25 @@ ST_GRAMMAR = r"""
     END_STRUCT.2:       /\bEND_STRUCT\b/i
     STRING.2:           /\bSTRING\b/i
 
+    PLUS:  "+"
+    MINUS: "-"
+    STAR:  "*"
+    SLASH: "/"
+    GE:    ">="
+    LE:    "<="
+    NE:    "<>"
+    GT:    ">"
+    LT:    "<"
+    EQ:    "="
+
     IDENT.1: /[a-zA-Z_][a-zA-Z0-9_]*/
 
     TYPE.2: /\b(BOOL|INT|UINT|DINT|REAL|LREAL|TIME|WORD|DWORD|BYTE)\b/i
     
-    # 🚀 修正 3：增强型字面量正则，覆盖 T#1ms, 16#FF 等
-    ST_LITERAL: /[a-zA-Z_0-9]+#[a-zA-Z_0-9\.\-\#]+/
+    # 🚀 修正 3：增强型字面量正则，覆盖 T#1ms, 16#FF, DINT#16#FF 等
+    # 优先级高于关键字/IDENT (.2/.1)：带 '#' 的片段必然是字面量，词法器无需再做歧义消解，
+    # 也避免 DINT#0 被先切成 TYPE、T#1s 被先切成 IDENT
+    ST_LITERAL.3: /[A-Za-z_0-9]+#[A-Za-z0-9_.\-#]+/
 
     %import common.NUMBER
     %import common.WS
@@ -145,6 +152,7 @@ ST_GRAMMAR = r"""
     %ignore CPP_COMMENT
     %ignore C_COMMENT
 
-    ST_COMMENT: "(*" /(.|\n)*?/ "*)"
+    # [\s\S] 是单个字符类，避免 (.|\n) 交替分支在每个字符上的回溯
+    ST_COMMENT: /\(\*[\s\S]*?\*\)/
     %ignore ST_COMMENT
 """
\ No newline at end of file
@@ -3,6 +3,7 @@ from lark import Transformer, v_args
 from typing import Any, List, Dict
 
 from stanalyzer.lark_analyzer import STSemanticAnalyzer
+from .new_st_rewritter import _STRewriterCore
 
 
 class STRewriterDeprecated(Transformer):
@@ -79,17 +80,17 @@ class STRewriterDeprecated(Transformer):
             return items
 
         new_items = list(items)
+        # 每条语句的读写集合只求一次，交换时同步交换
+        rw = [self.analyzer.get_rw_vars(stmt) for stmt in new_items]
         # 我们进行多次随机交换尝试
         for _ in range(len(new_items)):
             # 随机选择两个相邻的索引
             i = random.randint(0, len(new_items) - 2)
-            stmt_a = new_items[i]
-            stmt_b = new_items[i+1]
 
             # --- 核心依赖检查 ---
-            # 1. 提取读写集合
-            r_a, w_a = self.analyzer.get_read_vars(stmt_a), self.analyzer.get_write_vars(stmt_a)
-            r_b, w_b = self.analyzer.get_read_vars(stmt_b), self.analyzer.get_write_vars(stmt_b)
+            # 1. 取出读写集合
+            r_a, w_a = rw[i]
+            r_b, w_b = rw[i + 1]
 
             # 2. 判断是否存在冲突 (Data Hazard)
             # RAW (Read After Write): A 写 B 读
@@ -101,120 +102,55 @@ class STRewriterDeprecated(Transformer):
                 # 如果没有依赖，50% 概率交换顺序
                 if random.random() > 0.5:
                     new_items[i], new_items[i+1] = new_items[i+1], new_items[i]
+                    rw[i], rw[i + 1] = rw[i + 1], rw[i]
 
         return new_items
 
 
-class STRewriter:
+class STRewriter(_STRewriterCore):
     """
-    针对字典型 AST 的重写器。
+    针对字典型 AST 的重写器 (Lark 版字典结构，节点类型统一放在 type 字段)。
     基于数据依赖分析 (Data Dependency Analysis)，在保证语义等价的前提下，
     通过修改 AST 节点实现代码重构与数据增强。
+    遍历与指令重排共用 _STRewriterCore，这里只提供 Lark 结构下的各变异策略。
     """
 
-    def __init__(self, analyzer: Any, rename_map: dict = None, mode: str = "augment"):
-        """
-        :param analyzer: 语义分析器实例，需提供 get_read_vars 和 get_write_vars 方法
-        :param rename_map: 强制重命名映射字典
-        :param mode: 'augment' (随机增强) 或 'rename' (仅重命名)
-        """
-        self.analyzer = analyzer
-        self.rename_map = rename_map or {}
-        self.mode = mode
-
-    def rewrite(self, node: Any) -> Any:
-        """递归遍历并变异 AST 节点"""
-
-        # 1. 如果是代码块 (语句列表)
-        if isinstance(node, list):
-            # 先递归处理内部的每一条语句
-            processed_list = [self.rewrite(item) for item in node]
-            # 然后在当前层级尝试进行指令重排
-            return self._reorder_body(processed_list)
-
-        # 2. 如果是 AST 节点 (字典)
-        if isinstance(node, dict):
-            # 深层遍历：先处理所有子节点
-            new_node = {}
-            for k, v in node.items():
-                new_node[k] = self.rewrite(v)
-
-            # 拿到当前节点的类型，开始实施变异策略
-            ntype = new_node.get("type")
-
-            # --- 策略 A: 算术等价变换 (A + B -> B + A) ---
-            if ntype == "binary_op" and new_node.get("op") in ["+", "*"]:
-                if random.random() > 0.5:
-                    new_node["left"], new_node["right"] = new_node["right"], new_node["left"]
-
-            # --- 策略 B: 逻辑变换 (Condition Inversion) ---
-            # 将 IF A THEN B ELSE C 转换为 IF NOT A THEN C ELSE B
-            elif ntype == "if_statement" and new_node.get("else_branch"):
-                if random.random() > 0.5:
-                    original_cond = new_node["condition"]
-                    new_node["condition"] = {
-                        "type": "unary_op",
-                        "op": "NOT",
-                        "operand": original_cond
-                    }
-                    # 交换 THEN 和 ELSE 分支
-                    new_node["then_branch"], new_node["else_branch"] = new_node["else_branch"], new_node["then_branch"]
-
-            # --- 策略 C: 变量名混淆 (Variable Obfuscation) ---
-            elif ntype == "variable":
-                name = new_node["name"]
-
-                # 如果在强制重命名映射中，优先替换
-                if name in self.rename_map:
-                    new_node["name"] = self.rename_map[name]
-
-                # 否则，如果是 augment 模式，随机加前缀
-                elif self.mode == "augment" and random.random() > 0.7:
-                    # 简单过滤：全大写的通常是常量或系统字面量，不混淆；防止重复加前缀
-                    if not name.isupper() and not name.startswith("var_"):
-                        new_node["name"] = f"var_{name}"
-
-            return new_node
-
-        # 3. 其他基本类型 (字符串、数字等)，直接返回
-        return node
-
-    def _reorder_body(self, items: List[Any]) -> List[Any]:
-        """
-        基于依赖分析的“指令重排” (Instruction Scheduling)。
-        检测 RAW, WAR, WAW 数据冒险，确保乱序后的代码逻辑绝对安全。
-        """
-        # 如果 body 里只有 0 或 1 条语句，没法重排
-        if len(items) < 2:
-            return items
-
-        new_items = list(items)
-
-        # 我们进行多次随机交换尝试 (尝试次数等于语句条数)
-        for _ in range(len(new_items)):
-            # 随机选择两个相邻的索引
-            i = random.randint(0, len(new_items) - 2)
-            stmt_a = new_items[i]
-            stmt_b = new_items[i + 1]
-
-            # --- 核心依赖检查 ---
-            # 1. 提取读写集合
-            r_a = self.analyzer.get_read_vars(stmt_a)
-            w_a = self.analyzer.get_write_vars(stmt_a)
-
-            r_b = self.analyzer.get_read_vars(stmt_b)
-            w_b = self.analyzer.get_write_vars(stmt_b)
-
-            # 2. 判断是否存在冲突 (Data Hazard)
-            # RAW (Read After Write): A 写 B 读
-            # WAR (Write After Read): A 读 B 写
-            # WAW (Write After Write): A 写 B 写
-            has_dependency = (w_a & r_b) or (r_a & w_b) or (w_a & w_b)
-
-            # 3. 如果没有依赖，50% 概率交换它们的顺序
-            if not has_dependency and random.random() > 0.5:
-                new_items[i], new_items[i + 1] = new_items[i + 1], new_items[i]
-
-        return new_items
-
+    _EXPR_KEY = "type"
+    _STMT_KEY = "type"
+    _LEAF_TYPES = frozenset(("variable", "literal"))
+    _EXPR_STRATEGIES = {"binary_op": "_swap_binop", "variable": "_rename_var"}
+    _STMT_STRATEGIES = {"if_statement": "_invert_if"}
+
+    # --- 策略 A: 算术等价变换 (A + B -> B + A) ---
+    def _swap_binop(self, new_node: dict) -> None:
+        if new_node.get("op") in ("+", "*"):
+            if random.random() > 0.5:
+                new_node["left"], new_node["right"] = new_node["right"], new_node["left"]
+
+    # --- 策略 B: 逻辑变换 (Condition Inversion) ---
+    def _invert_if(self, new_node: dict) -> None:
+        # 将 IF A THEN B ELSE C 转换为 IF NOT A THEN C ELSE B
+        if new_node.get("else_branch"):
+            if random.random() > 0.5:
+                original_cond = new_node["condition"]
+                new_node["condition"] = {
+                    "type": "unary_op",
+                    "op": "NOT",
+                    "operand": original_cond
+                }
+                # 交换 THEN 和 ELSE 分支
+                new_node["then_branch"], new_node["else_branch"] = new_node["else_branch"], new_node["then_branch"]
+
+    # --- 策略 C: 变量名混淆 (Variable Obfuscation) ---
+    def _rename_var(self, new_node: dict) -> None:
+        name = new_node["name"]
+
+        # 如果在强制重命名映射中，优先替换
+        if name in self.rename_map:
+            new_node["name"] = self.rename_map[name]
 
+        # 否则，如果是 augment 模式，随机加前缀
+        elif self.mode == "augment" and random.random() > 0.7:
+            # 简单过滤：全大写的通常是常量或系统字面量，不混淆；防止重复加前缀
+            if not name.isupper() and not name.startswith("var_"):
+                new_node["name"] = f"var_{name}"
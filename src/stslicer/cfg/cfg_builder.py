@@ -32,6 +32,9 @@ class InstrCFG:
     # 所有可能终止的指令下标集合
     exits: Set[int]
 
+    # label 名 -> 指令下标（由 CFGBuilder 扫描得到，供后续 pass 复用）
+    label_index: Dict[str, int] = field(default_factory=dict)
+
 
 class CFGBuilder:
     """
@@ -79,6 +82,7 @@ class CFGBuilder:
             pred=self.pred,
             entry=entry,
             exits=exits,
+            label_index=self.label_index,
         )
 
     # ---------- 内部步骤 1：扫描 label ----------
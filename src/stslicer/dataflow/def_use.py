@@ -80,8 +80,10 @@ def _expr_to_str_fallback(e: Expr) -> str:
     # 兜底：用 repr 或 class 名
     return repr(e)
 
-def collect_var_accesses(expr: Expr) -> Set[VarAccess]:
-    result: Set[VarAccess] = set()
+def collect_var_accesses(expr: Expr, result: Optional[Set[VarAccess]] = None) -> Set[VarAccess]:
+    """收集表达式中的变量访问；传入 result 时直接追加到该集合，避免为每个子表达式构造临时集合再合并"""
+    if result is None:
+        result = set()
 
     def _walk(e: Expr, fields=(), indices=()):
         if isinstance(e, VarRef):
@@ -246,11 +248,11 @@ class DefUseAnalyzer:
                 uset: Set[VarAccess] = set()
 
                 if isinstance(ast_stmt, Assignment):
-                    dset |= collect_var_accesses(ast_stmt.target)
-                    uset |= collect_var_accesses(ast_stmt.value)
+                    collect_var_accesses(ast_stmt.target, dset)
+                    collect_var_accesses(ast_stmt.value, uset)
                 elif isinstance(ast_stmt, CallStmt):
                     for arg in ast_stmt.args:
-                        uset |= collect_var_accesses(arg)
+                        collect_var_accesses(arg, uset)
 
                 self.def_accesses[i] = dset
                 self.use_accesses[i] = uset
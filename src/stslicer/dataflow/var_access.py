@@ -11,9 +11,9 @@ class VarAccess:
     # 以后需要更精细时再换成 AST 或符号化结构。
 
     def pretty(self) -> str:
-        s = self.base
-        for idx in self.indices:
-            s += f"[{idx}]"
-        for fld in self.fields:
-            s += f".{fld}"
-        return s
+        if not self.indices and not self.fields:
+            return self.base
+        parts = [self.base]
+        parts.extend(f"[{idx}]" for idx in self.indices)
+        parts.extend(f".{fld}" for fld in self.fields)
+        return "".join(parts)
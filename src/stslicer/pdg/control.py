@@ -1,11 +1,12 @@
-from typing import Dict, List, Set
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
 
 
 class PDGControlBuilder:
     """
     使用 Post-Dominance Frontier 计算控制依赖：
-    1) 已有扩展 CFG（含虚拟出口） + 后支配集合 postdom
-    2) 计算立即后支配 ipostdom（postdom tree）
+    1) 已有扩展 CFG（含虚拟出口）
+    2) 用 Cooper-Harvey-Kennedy 迭代算法计算立即后支配 ipostdom（postdom tree）
     3) 自底向上计算每个结点 X 的 Post-Dominance Frontier(X)
     4) 反向得到 Control Dependence：如果 Y ∈ PDF(X)，则 Y 控制 X
     """
@@ -14,13 +15,14 @@ class PDGControlBuilder:
         self,
         succ_ext: Dict[int, List[int]],
         exit_id: int,
-        postdom: Dict[int, Set[int]],
+        postdom: Optional[Dict[int, Set[int]]] = None,
     ):
         """
         :param succ_ext: 扩展后的 CFG 邻接表（包含虚拟出口）
         :param exit_id: 虚拟出口结点编号（通常 = 实际指令数 n）
         :param postdom: 每个结点的后支配集合（包含自己），只包括真实结点 0..n-1
-                        注意：虚拟出口的 postdom 集合需要我们自己补上
+                        注意：虚拟出口的 postdom 集合需要我们自己补上。
+                        立即后支配直接由图结构迭代求出，不再依赖该参数，保留仅为兼容旧调用
         """
         self.succ_ext = succ_ext
         self.exit_id = exit_id
@@ -29,50 +31,91 @@ class PDGControlBuilder:
         self.nodes: Set[int] = set(succ_ext.keys())
 
         # 把 postdom 扩展到包含虚拟出口
-        self.postdom: Dict[int, Set[int]] = dict(postdom)
+        self.postdom: Dict[int, Set[int]] = dict(postdom or {})
         if exit_id not in self.postdom:
             self.postdom[exit_id] = {exit_id}
 
         # 反向边
-        self.pred_ext: Dict[int, List[int]] = {n: [] for n in self.nodes}
+        # defaultdict 省掉逐条边的 setdefault；预先放入全部结点，保持原来的键集合
+        self.pred_ext: Dict[int, List[int]] = defaultdict(list, {n: [] for n in self.nodes})
         for u, vs in self.succ_ext.items():
             for v in vs:
-                self.pred_ext.setdefault(v, []).append(u)
+                self.pred_ext[v].append(u)
 
     # ---------- 工具：立即后支配 & postdom tree ----------
 
     def _compute_ipostdom(self) -> Dict[int, int]:
         """
-        根据 postdom 集合，计算每个结点的立即后支配 ipd[n]。
-        朴素实现：在 postdom[n] \ {n} 中选 postdom 集合规模最小的结点。
+        计算每个结点的立即后支配 ipd[n]。
+        后支配即反向 CFG (以虚拟出口为根) 上的支配，这里用 Cooper-Harvey-Kennedy 迭代算法：
+        按反向 CFG 的逆后序反复用 intersect 合并各后继的 ipd，直到不动点。
+        只依赖图结构，不需要完整的 postdom 集合；实际 CFG 上通常两三轮即收敛。
+        到达不了出口的结点 (如死循环) 没有后支配者，挂到虚拟出口下。
         """
-        ipd: Dict[int, int] = {}
+        exit_id = self.exit_id
+        po_num = self._reverse_cfg_postorder()
+        # 逆后序 (出口最先)，出口本身不参与迭代
+        rpo = sorted(po_num, key=po_num.get, reverse=True)[1:]
+
+        ipd: Dict[int, int] = {exit_id: exit_id}
+
+        def intersect(b1: int, b2: int) -> int:
+            # 两个指针沿部分构建的后支配树向上走，直到相遇
+            while b1 != b2:
+                while po_num[b1] < po_num[b2]:
+                    b1 = ipd[b1]
+                while po_num[b2] < po_num[b1]:
+                    b2 = ipd[b2]
+            return b1
+
+        changed = True
+        while changed:
+            changed = False
+            for n in rpo:
+                new_ipd = None
+                for s in self.succ_ext.get(n, []):
+                    if s not in ipd:
+                        continue
+                    new_ipd = s if new_ipd is None else intersect(s, new_ipd)
+                if new_ipd is not None and ipd.get(n) != new_ipd:
+                    ipd[n] = new_ipd
+                    changed = True
 
         for n in self.nodes:
-            if n == self.exit_id:
-                ipd[n] = self.exit_id
-                continue
-
-            candidates = [p for p in self.postdom[n] if p != n]
-            if not candidates:
-                ipd[n] = self.exit_id
-                continue
-
-            # 选 postdom 集合最小的那个作为“最近”的后支配者
-            ipd[n] = min(candidates, key=lambda p: len(self.postdom[p]))
-
+            ipd.setdefault(n, exit_id)
         return ipd
 
+    def _reverse_cfg_postorder(self) -> Dict[int, int]:
+        """
+        从虚拟出口出发沿反向边 (pred_ext) 做 DFS，返回 结点 -> 后序编号。
+        只包含能到达出口的结点；用显式栈实现，长 CFG 不会触发递归上限。
+        """
+        po_num: Dict[int, int] = {}
+        visited = {self.exit_id}
+        # 栈元素: (结点, 其前驱迭代器)
+        stack = [(self.exit_id, iter(self.pred_ext.get(self.exit_id, [])))]
+        while stack:
+            node, it = stack[-1]
+            for p in it:
+                if p not in visited:
+                    visited.add(p)
+                    stack.append((p, iter(self.pred_ext.get(p, []))))
+                    break
+            else:
+                stack.pop()
+                po_num[node] = len(po_num)
+        return po_num
+
     def _build_postdom_tree(self, ipd: Dict[int, int]) -> Dict[int, List[int]]:
         """
         根据 ipostdom，构造后支配树的 children 列表。
         """
-        children: Dict[int, List[int]] = {n: [] for n in self.nodes}
+        children: Dict[int, List[int]] = defaultdict(list, {n: [] for n in self.nodes})
         for n in self.nodes:
             if n == self.exit_id:
                 continue
             parent = ipd[n]
-            children.setdefault(parent, []).append(n)
+            children[parent].append(n)
         return children
 
     def _postdom_tree_postorder(
@@ -80,15 +123,19 @@ class PDGControlBuilder:
     ) -> List[int]:
         """
         返回后支配树上的后序遍历序列（用于自底向上计算 PDF）。
+        显式栈代替递归 DFS：上百条顺序语句的长 POU 会形成同样深的后支配链，递归会触发上限。
         """
         order: List[int] = []
-
-        def dfs(u: int):
-            for v in children.get(u, []):
-                dfs(v)
-            order.append(u)
-
-        dfs(root)
+        # 栈元素: (结点, 子结点是否已入栈)
+        stack = [(root, False)]
+        while stack:
+            u, expanded = stack.pop()
+            if expanded:
+                order.append(u)
+                continue
+            stack.append((u, True))
+            # 逆序压栈，保证子结点按原顺序出栈
+            stack.extend([(v, False) for v in reversed(children.get(u, []))])
         return order
 
     # ---------- 核心：计算 Post-Dominance Frontier & 控制依赖 ----------
@@ -103,30 +150,42 @@ class PDGControlBuilder:
         postorder = self._postdom_tree_postorder(self.exit_id, children)
 
         # 1) 计算每个结点 X 的 Post-Dominance Frontier(X)
-        pdf: Dict[int, Set[int]] = {n: set() for n in self.nodes}
-
-        # 自底向上遍历 postdom tree
-        for x in reversed(postorder):
-            # (a) 直接前驱
+        # 结点集合用整数位图表示 (结点 n 对应第 n 位)：并集是一次 |，
+        # “去掉 ipd(Y) == X 的 Y” 是与预先算好的掩码做一次 & ~
+        pred_bits: Dict[int, int] = {}
+        for x in self.nodes:
+            m = 0
             for y in self.pred_ext.get(x, []):
-                if ipd.get(y) != x:
-                    pdf[x].add(y)
+                m |= 1 << y
+            pred_bits[x] = m
+
+        # ipd_bits[x]: 立即后支配者为 x 的结点集合
+        ipd_bits: Dict[int, int] = {n: 0 for n in self.nodes}
+        for y, p in ipd.items():
+            ipd_bits[p] = ipd_bits.get(p, 0) | (1 << y)
 
-            # (b) 从子节点继承
+        pdf: Dict[int, int] = {}
+
+        # 自底向上遍历 postdom tree (后序：子结点先于父结点)
+        for x in postorder:
+            # (a) 直接前驱 + (b) 从子节点继承
+            m = pred_bits.get(x, 0)
             for z in children.get(x, []):
-                for y in pdf[z]:
-                    if ipd.get(y) != x:
-                        pdf[x].add(y)
+                m |= pdf[z]
+            pdf[x] = m & ~ipd_bits.get(x, 0)
 
         # 2) 反向 PDF 得到控制依赖：如果 y ∈ PDF(x)，则 y 控制 x
-        ctrl_deps: Dict[int, Set[int]] = {n: set() for n in self.nodes}
-        for x in self.nodes:
-            for y in pdf[x]:
+        ctrl_deps: Dict[int, Set[int]] = defaultdict(set, {n: set() for n in self.nodes})
+        for x, m in pdf.items():
+            while m:
+                low = m & -m
                 # y --ctrl--> x
-                ctrl_deps.setdefault(y, set()).add(x)
+                ctrl_deps[low.bit_length() - 1].add(x)
+                m ^= low
 
         # 不需要虚拟出口的依赖边
         if self.exit_id in ctrl_deps:
             del ctrl_deps[self.exit_id]
 
-        return ctrl_deps
+        # 返回普通 dict，避免调用方查询不存在的结点时被 defaultdict 悄悄插入新键
+        return dict(ctrl_deps)
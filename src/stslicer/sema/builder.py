@@ -1,37 +1,43 @@
 from __future__ import annotations
-from typing import List
+from typing import FrozenSet, List, Optional
 
 from .symbols import VarSymbol, FBSymbol, POUSymbolTable, ProjectSymbolTable
 from ..ast.nodes import ProgramDecl, FBDecl
 
 
-def is_fb_type(type_name: str) -> bool:
+def is_fb_type(type_name: str, fb_type_set: Optional[FrozenSet[str]] = None) -> bool:
     """
-    简单占位实现：后面你可以根据工程的 FB 类型列表来真正判断。
-    现在默认所有全大写且以 "_FB" 结尾的是 FB 类型。
+    判断类型名是否为 FB 类型。
+    - 传入工程的 FB 类型集合 fb_type_set 时，直接做 O(1) 的集合查找；
+    - 否则按命名约定：以 "_FB" 结尾的是 FB 类型（不再额外用 isupper() 扫描整个字符串）。
     """
-    return type_name.isupper() and type_name.endswith("_FB")
+    if fb_type_set is not None:
+        return type_name in fb_type_set
+    return type_name.endswith("_FB")
 
 
-def build_symbol_table(programs: List[ProgramDecl | FBDecl]) -> ProjectSymbolTable:
+def build_symbol_table(
+    programs: List[ProgramDecl | FBDecl],
+    fb_type_set: Optional[FrozenSet[str]] = None,
+) -> ProjectSymbolTable:
     proj = ProjectSymbolTable()
 
     for pou in programs:
-        pou_tab = POUSymbolTable(name=pou.name, vars={}, fb_instances={})
+        # 先在局部字典里一次性收集，再整体交给 POUSymbolTable，避免逐个 add_var/add_fb_instance 的方法调用
+        var_items = {}
+        fb_items = {}
         for v in pou.vars:
-            if is_fb_type(v.type):
-                fb_sym = FBSymbol(name=v.name, type=v.type)
-                pou_tab.add_fb_instance(fb_sym)
+            if is_fb_type(v.type, fb_type_set):
+                fb_items[v.name] = FBSymbol(name=v.name, type=v.type)
             else:
-                var_sym = VarSymbol(
+                # 这里暂时不区分 global / local，后面可以根据 storage 字段细分
+                var_items[v.name] = VarSymbol(
                     name=v.name,
                     type=v.type,
                     storage=v.storage,
                     init_expr=v.init_expr,
                 )
-                # 这里暂时不区分 global / local，后面可以根据 storage 字段细分
-                pou_tab.add_var(var_sym)
 
-        proj.add_pou(pou_tab)
+        proj.add_pou(POUSymbolTable(name=pou.name, vars=var_items, fb_instances=fb_items))
 
     return proj
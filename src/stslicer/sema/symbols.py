@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 from ..ast.nodes import Expr
 
@@ -24,16 +24,23 @@ class POUSymbolTable:
     name: str
     vars: Dict[str, VarSymbol]
     fb_instances: Dict[str, FBSymbol]
+    # get_all_symbols 的结果缓存，add_var / add_fb_instance 时作废
+    _symbols_cache: Optional[Tuple[VarSymbol, ...]] = field(default=None, init=False, repr=False, compare=False)
 
     def add_var(self, sym: VarSymbol):
         self.vars[sym.name] = sym
+        self._symbols_cache = None
 
     def add_fb_instance(self, sym: FBSymbol):
         self.fb_instances[sym.name] = sym
+        self._symbols_cache = None
     
-    def get_all_symbols(self):
+    def get_all_symbols(self) -> Tuple[VarSymbol, ...]:
         # 先只返回变量符号；后面需要的话也可以把 fb_instances 合并进去
-        return list(self.vars.values())
+        # 返回缓存的只读 tuple，反复调用不再每次复制一份列表
+        if self._symbols_cache is None:
+            self._symbols_cache = tuple(self.vars.values())
+        return self._symbols_cache
         # 如果想把 FB 实例也算进去，可以写：
         # return list(self.vars.values()) + list(self.fb_instances.values())
 
@@ -4,23 +4,59 @@ class STSlicer:
     def __init__(self, parser_output: List[Dict]):
         self.body = parser_output
         self.slices = []
+        # get_variables 的结果缓存: id(expr) -> (expr, frozenset)，持有 expr 引用防止 id 被复用；
+        # 分支上的子切片器共用同一个缓存
+        self._var_cache: Dict[int, tuple] = {}
+        # backward_slice_set 用的定义/使用标注，首次切片时由 _annotate 生成；
+        # _var_ids 把大写变量名映射到位号，_name_bits 缓存原始写法到位号的映射
+        self._defuse = None
+        self._var_ids: Dict[str, int] = {}
+        self._name_bits: Dict[str, int] = {}
+
+    def _child(self, body: List[Dict]) -> "STSlicer":
+        """为 IF 分支创建子切片器，共享表达式变量缓存"""
+        child = STSlicer(body)
+        child._var_cache = self._var_cache
+        return child
 
     def get_variables(self, node):
-        """递归提取表达式中引用的所有变量 (Read Set)"""
+        """提取表达式中引用的所有变量 (Read Set)。返回缓存里的 frozenset，调用方不要修改"""
         if not node or not isinstance(node, dict):
-            return set()
-
-        ntype = node.get("type")
-        if ntype == "variable":
-            return {node["name"]}
-        elif ntype == "binary_op":
-            return self.get_variables(node["left"]) | self.get_variables(node["right"])
-        elif ntype == "unary_op":
-            return self.get_variables(node["operand"])
-        elif ntype == "if_statement":
-            # IF 语句的依赖包含条件变量
-            return self.get_variables(node["condition"])
-        return set()
+            return frozenset()
+        # 切片期间 AST 不会被修改，按 id 记忆化：同一子树 (如反复切片时的 IF 条件) 只遍历一次
+        cache = self._var_cache
+        hit = cache.get(id(node))
+        if hit is not None:
+            return hit[1]
+
+        root = node
+        # 显式栈代替递归：结果累积到同一个集合里，不为每个叶子创建临时 set 再逐层合并
+        res = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if not node or not isinstance(node, dict):
+                continue
+            hit = cache.get(id(node))
+            if hit is not None:
+                res.update(hit[1])
+                continue
+
+            ntype = node.get("type")
+            if ntype == "variable":
+                res.add(node["name"])
+            elif ntype == "binary_op":
+                stack.append(node["right"])
+                stack.append(node["left"])
+            elif ntype == "unary_op":
+                stack.append(node["operand"])
+            elif ntype == "if_statement":
+                # IF 语句的依赖包含条件变量
+                stack.append(node["condition"])
+
+        res = frozenset(res)
+        cache[id(root)] = (root, res)
+        return res
 
     def backward_slice(self, target_var: str) -> List[Dict]:
         """
@@ -47,7 +83,7 @@ class STSlicer:
             elif stmt["type"] == "if_statement":
                 # 这里简化处理：如果 IF 块内有语句被切中，那么 IF 条件也必须包含
                 # 在工业级切片中，这属于控制依赖 (Control Dependency)
-                inner_slice = STSlicer(stmt["then_branch"]).backward_slice_set(relevant_vars)
+                inner_slice = self._child(stmt["then_branch"]).backward_slice_set(relevant_vars)
                 if inner_slice:
                     sliced_statements.append({
                         "type": "if_statement",
@@ -58,6 +94,56 @@ class STSlicer:
 
         return list(reversed(sliced_statements))
 
+    def _mask(self, names) -> int:
+        """把一组变量名 (不区分大小写) 编码成位掩码，新变量名按出现顺序分配位号"""
+        mask = 0
+        for name in names:
+            mask |= 1 << self._bit_of(name)
+        return mask
+
+    def _bit_of(self, name: str) -> int:
+        # 原始写法 -> 位号直接命中，同一个变量名反复出现时不再每次 upper() 分配新字符串
+        bit = self._name_bits.get(name)
+        if bit is None:
+            ids = self._var_ids
+            upper = name.upper()
+            bit = ids.get(upper)
+            if bit is None:
+                bit = ids[upper] = len(ids)
+            self._name_bits[name] = bit
+        return bit
+
+    def _annotate(self) -> List[tuple]:
+        """
+        一次遍历预先求出每条语句的定义/使用，结果缓存在实例上，之后每次切片只做位运算。
+        变量名统一大写后编号，定义/使用都编码成 int 位掩码 (Python int 不限位宽，变量再多也不用退回集合)。
+        条目格式：
+            赋值: (目标位, 右侧使用掩码, 语句, None, None)
+            IF:   (0, 条件使用掩码, 语句, then 条目列表, else 条目列表或 None)
+        其余语句不参与切片，直接跳过。
+        """
+        if self._defuse is not None:
+            return self._defuse
+
+        self._defuse = []
+        # 显式栈展开嵌套的 IF 分支：子条目列表先挂到父条目上，再压栈填充
+        stack = [(self.body, self._defuse)]
+        while stack:
+            body, entries = stack.pop()
+            for stmt in body:
+                if stmt["type"] == "assignment":
+                    uses = self._mask(self.get_variables(stmt["expr"]))
+                    entries.append((1 << self._bit_of(stmt["target"]), uses, stmt, None, None))
+                elif stmt["type"] == "if_statement":
+                    uses = self._mask(self.get_variables(stmt["condition"]))
+                    then_entries = []
+                    else_entries = [] if stmt.get("else_branch") else None
+                    entries.append((0, uses, stmt, then_entries, else_entries))
+                    stack.append((stmt["then_branch"], then_entries))
+                    if else_entries is not None:
+                        stack.append((stmt["else_branch"], else_entries))
+        return self._defuse
+
     def backward_slice_set(self, var_set: Set[str]) -> List[Dict]:
         """
         基于初始变量集合进行后向切片，支持多变量依赖追踪。
@@ -68,51 +154,60 @@ class STSlicer:
         Returns:
             List[Dict]: 按照原始代码顺序排列的切片语句列表
         """
-        # 复制一份初始变量集，避免修改输入参数
-        relevant_vars = set(v.upper() for v in var_set)
-        sliced_statements = []
-
-        # 从后往前遍历语句 (逆序依赖分析)
-        for stmt in reversed(self.body):
-            if stmt["type"] == "assignment":
-                target = stmt["target"].upper()
+        entries = self._annotate()
+        # 正文里没有出现过的变量不会命中任何语句，不必为它们分配位号
+        name_bits, ids = self._name_bits, self._var_ids
+        relevant = 0
+        for v in var_set:
+            bit = name_bits.get(v)
+            if bit is None:
+                bit = ids.get(v.upper())
+            if bit is not None:
+                relevant |= 1 << bit
+        return self._slice_entries(entries, relevant)
+
+    def _slice_entries(self, entries: List[tuple], relevant: int) -> List[Dict]:
+        """在预先标注好的条目上做后向切片，relevant 是关注变量的位掩码"""
+        # 切片结果从后往前写进预分配的列表，结束时切出已填充的尾部即为原始顺序，不必再整体翻转
+        n = len(entries)
+        sliced_statements = [None] * n
+        k = n
+
+        # 按下标从后往前遍历语句 (逆序依赖分析)
+        for i in range(n - 1, -1, -1):
+            target, uses, stmt, then_entries, else_entries = entries[i]
+            if then_entries is None:
                 # 命中：当前赋值语句的目标在我们的关注列表中
-                if target in relevant_vars:
-                    sliced_statements.append(stmt)
+                if target & relevant:
+                    k -= 1
+                    sliced_statements[k] = stmt
 
                     # 1. 既然已经找到了这个变量的来源，暂时移除它（除非它是自增 A := A + 1）
                     # 注意：在 PLC 中由于周期循环，通常不移除，这里视作单周期分析
-                    # relevant_vars.discard(target)
+                    # relevant &= ~target
 
                     # 2. 将等号右侧引用的所有变量加入“兴趣列表”
-                    rhs_vars = self.get_variables(stmt["expr"])
-                    relevant_vars.update(v.upper() for v in rhs_vars)
-
-            elif stmt["type"] == "if_statement":
-                # 对于控制流，逻辑更复杂一些：
-                # 如果 IF 块内的任何语句对 relevant_vars 有贡献，
-                # 那么整个 IF 结构（包括 Condition）都必须包含在切片中。
-
-                # 递归分析 Then 块
-                then_slicer = STSlicer(stmt["then_branch"])
-                inner_then_slice = then_slicer.backward_slice_set(relevant_vars)
-
-                # 递归分析 Else 块（如果存在）
-                inner_else_slice = []
-                if stmt.get("else_branch"):
-                    else_slicer = STSlicer(stmt["else_branch"])
-                    inner_else_slice = else_slicer.backward_slice_set(relevant_vars)
-
-                if inner_then_slice or inner_else_slice:
-                    # 只要分支里有东西被切中，Condition 引用的变量就变为了“必须关注”
-                    cond_vars = self.get_variables(stmt["condition"])
-                    relevant_vars.update(v.upper() for v in cond_vars)
-
-                    # 构造一个新的切片后的 IF 节点
-                    sliced_stmt = stmt.copy()
-                    sliced_stmt["then_branch"] = inner_then_slice
-                    sliced_stmt["else_branch"] = inner_else_slice
-                    sliced_statements.append(sliced_stmt)
-
-        # 因为是从后往前扫描的，最后返回前需要翻转回原始顺序
-        return list(reversed(sliced_statements))
\ No newline at end of file
+                    relevant |= uses
+                continue
+
+            # 对于控制流，逻辑更复杂一些：
+            # 如果 IF 块内的任何语句对 relevant_vars 有贡献，
+            # 那么整个 IF 结构（包括 Condition）都必须包含在切片中。
+            # 掩码是不可变的 int，两个分支各自在当前关注集合上分析，互不影响
+            inner_then_slice = self._slice_entries(then_entries, relevant)
+            inner_else_slice = []
+            if else_entries is not None:
+                inner_else_slice = self._slice_entries(else_entries, relevant)
+
+            if inner_then_slice or inner_else_slice:
+                # 只要分支里有东西被切中，Condition 引用的变量就变为了“必须关注”
+                relevant |= uses
+
+                # 构造一个新的切片后的 IF 节点
+                sliced_stmt = stmt.copy()
+                sliced_stmt["then_branch"] = inner_then_slice
+                sliced_stmt["else_branch"] = inner_else_slice
+                k -= 1
+                sliced_statements[k] = sliced_stmt
+
+        return sliced_statements[k:]
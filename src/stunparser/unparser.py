@@ -1,6 +1,3 @@
-
-
-
 # ==========================================
 # 4. 代码还原器
 # ==========================================
@@ -11,173 +8,251 @@ class STUnparser:
     """
     代码还原器 (Unparser)。
     将 STAstBuilder 生成的字典型 AST 完美还原为带有标准缩进的 IEC 61131-3 源码。
-    """
-
-    def unparse(self, node, indent=0) -> str:
-        if node is None:
-            return ""
-
-        spacing = "    " * indent
 
-        # 1. 如果是列表（多个语句或 POU），递归平铺
-        if isinstance(node, list):
-            return "".join([self.unparse(item, indent) for item in node])
-
-        if not isinstance(node, dict):
-            return ""
-
-        # ==========================================
-        # 2. 顶层 POU 结构 (PROGRAM / FB / FUNCTION)
-        # ==========================================
-        if "unit_type" in node:
-            ut = node["unit_type"]
-            name = node.get("name", "Unnamed")
+    内部所有 _emit* 方法都把代码片段追加到同一个 out 列表中，最后只做一次 "".join，
+    避免逐语句 `code += ...` 带来的 O(n²) 字符串重分配。
+    语句渲染方法的 out 里还可能出现 (子语句块, 缩进)，由 _emit 的显式栈负责展开。
+    """
 
-            if ut == "FUNCTION" and "return_type" in node:
-                code = f"{spacing}{ut} {name} : {node['return_type']}\n"
+    # 预先生成的缩进字符串，避免每条语句都重新计算 "    " * indent
+    _INDENTS = tuple("    " * i for i in range(64))
+
+    def __init__(self) -> None:
+        # stmt_type / expr_type -> 渲染方法，一次字典查找代替逐个 if/elif 比较
+        self._stmt_emitters = {
+            "assign": self._emit_assign,
+            "if": self._emit_if,
+            "case": self._emit_case,
+            "for": self._emit_for,
+            "while": self._emit_while,
+            "repeat": self._emit_repeat,
+            "call": self._emit_call_stmt,
+            "return": self._emit_return,
+            "exit": self._emit_exit,
+            "continue": self._emit_continue,
+        }
+        self._expr_emitters = {
+            "var": self._emit_var,
+            "literal": self._emit_literal,
+            "binop": self._emit_binop,
+            "unaryop": self._emit_unaryop,
+            "call": self._emit_call_expr,
+        }
+
+    @classmethod
+    def _spacing(cls, indent: int) -> str:
+        return cls._INDENTS[indent] if indent < 64 else "    " * indent
+
+    def unparse(self, node: Any, indent: int = 0) -> str:
+        out: List[str] = []
+        self._emit(node, indent, out)
+        return "".join(out)
+
+    def _emit(self, node: Any, indent: int, out: List[str]) -> None:
+        # 显式栈代替递归：栈元素是待输出的代码片段 (str) 或待展开的 (节点, 缩进)。
+        # 语句渲染方法不直接递归子语句块，而是把片段与子块按顺序写进 todo，
+        # 再逆序压栈，保证输出顺序不变；深层嵌套的 IF/FOR/WHILE 不会触发递归上限
+        stack: list = [(node, indent)]
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                out.append(item)
+                continue
+
+            node, indent = item
+            if node is None:
+                continue
+
+            # 1. 如果是列表（多个语句或 POU），按原顺序平铺
+            if isinstance(node, list):
+                stack.extend([(child, indent) for child in reversed(node)])
+                continue
+
+            if not isinstance(node, dict):
+                continue
+
+            spacing = self._spacing(indent)
+            todo: list = []
+
+            # 2. 顶层 POU 结构 (PROGRAM / FB / FUNCTION)
+            if "unit_type" in node:
+                self._emit_pou(node, indent, spacing, todo)
             else:
-                code = f"{spacing}{ut} {name}\n"
-
-            # 渲染变量块
-            code += self._unparse_var_blocks(node.get("var_blocks", []), indent + 1)
-            # 渲染主体语句
-            code += self.unparse(node.get("body", []), indent + 1)
-            code += f"{spacing}END_{ut}\n"
-            return code
-
-        # ==========================================
-        # 3. 语句级还原 (Statements)
-        # ==========================================
-        stmt_type = node.get("stmt_type")
-
-        if stmt_type == "assign":
-            target = self._expr(node.get("target"))
-            value = self._expr(node.get("value"))
-            return f"{spacing}{target} := {value};\n"
-
-        elif stmt_type == "if":
-            cond = self._expr(node.get("cond"))
-            code = f"{spacing}IF {cond} THEN\n"
-            code += self.unparse(node.get("then_body", []), indent + 1)
-
-            for elif_b in node.get("elif_branches", []):
-                e_cond = self._expr(elif_b.get("cond"))
-                code += f"{spacing}ELSIF {e_cond} THEN\n"
-                code += self.unparse(elif_b.get("then_body", []), indent + 1)
-
-            else_b = node.get("else_body", [])
-            if else_b:
-                code += f"{spacing}ELSE\n"
-                code += self.unparse(else_b, indent + 1)
-
-            code += f"{spacing}END_IF;\n"
-            return code
-
-        elif stmt_type == "case":
-            cond = self._expr(node.get("cond"))
-            code = f"{spacing}CASE {cond} OF\n"
-            for entry in node.get("entries", []):
-                conds = ", ".join(entry.get("conds", []))
-                code += f"{spacing}    {conds}:\n"
-                code += self.unparse(entry.get("body", []), indent + 2)
-
-            else_b = node.get("else_body", [])
-            if else_b:
-                code += f"{spacing}    ELSE\n"
-                code += self.unparse(else_b, indent + 2)
-            code += f"{spacing}END_CASE;\n"
-            return code
-
-        elif stmt_type == "for":
-            var = node.get("var", "")
-            start = self._expr(node.get("start"))
-            end = self._expr(node.get("end"))
-            code = f"{spacing}FOR {var} := {start} TO {end}"
-            if node.get("step"):
-                code += f" BY {self._expr(node.get('step'))}"
-            code += " DO\n"
-            code += self.unparse(node.get("body", []), indent + 1)
-            code += f"{spacing}END_FOR;\n"
-            return code
-
-        elif stmt_type == "while":
-            cond = self._expr(node.get("cond"))
-            code = f"{spacing}WHILE {cond} DO\n"
-            code += self.unparse(node.get("body", []), indent + 1)
-            code += f"{spacing}END_WHILE;\n"
-            return code
-
-        elif stmt_type == "repeat":
-            code = f"{spacing}REPEAT\n"
-            code += self.unparse(node.get("body", []), indent + 1)
-            cond = self._expr(node.get("until_cond"))
-            code += f"{spacing}UNTIL {cond}\n{spacing}END_REPEAT;\n"
-            return code
-
-        elif stmt_type == "call":
-            func_name = node.get("func_name", "")
-            args = [self._expr(a) for a in node.get("args", [])]
-            return f"{spacing}{func_name}({', '.join(args)});\n"
-
-        elif stmt_type == "return":
-            return f"{spacing}RETURN;\n"
-        elif stmt_type == "exit":
-            return f"{spacing}EXIT;\n"
-        elif stmt_type == "continue":
-            return f"{spacing}CONTINUE;\n"
-
-        return ""
+                # 3. 语句级还原 (Statements)
+                emitter = self._stmt_emitters.get(node.get("stmt_type"))
+                if emitter is None:
+                    continue
+                emitter(node, indent, spacing, todo)
+
+            todo.reverse()
+            stack.extend(todo)
+
+    def _emit_pou(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        ut = node["unit_type"]
+        name = node.get("name", "Unnamed")
+
+        if ut == "FUNCTION" and "return_type" in node:
+            out.append(f"{spacing}{ut} {name} : {node['return_type']}\n")
+        else:
+            out.append(f"{spacing}{ut} {name}\n")
+
+        # 渲染变量块
+        self._emit_var_blocks(node.get("var_blocks", []), indent + 1, out)
+        # 渲染主体语句
+        out.append((node.get("body", []), indent + 1))
+        out.append(f"{spacing}END_{ut}\n")
 
     # ==========================================
-    # 4. 表达式级还原 (Expressions)
+    # 3. 语句级还原 (Statements)
     # ==========================================
-    def _expr(self, expr) -> str:
-        if expr is None: return ""
-        if isinstance(expr, str): return expr
-        if not isinstance(expr, dict): return str(expr)
-
-        expr_type = expr.get("expr_type")
+    def _emit_assign(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(spacing)
+        self._emit_expr(node.get("target"), out)
+        out.append(" := ")
+        self._emit_expr(node.get("value"), out)
+        out.append(";\n")
+
+    def _emit_if(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}IF ")
+        self._emit_expr(node.get("cond"), out)
+        out.append(" THEN\n")
+        out.append((node.get("then_body", []), indent + 1))
+
+        for elif_b in node.get("elif_branches", []):
+            out.append(f"{spacing}ELSIF ")
+            self._emit_expr(elif_b.get("cond"), out)
+            out.append(" THEN\n")
+            out.append((elif_b.get("then_body", []), indent + 1))
+
+        else_b = node.get("else_body", [])
+        if else_b:
+            out.append(f"{spacing}ELSE\n")
+            out.append((else_b, indent + 1))
+
+        out.append(f"{spacing}END_IF;\n")
+
+    def _emit_case(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}CASE ")
+        self._emit_expr(node.get("cond"), out)
+        out.append(" OF\n")
+        # 分支标签比 CASE 多缩进一级，直接取缓存的缩进串
+        label_spacing = self._spacing(indent + 1)
+        for entry in node.get("entries", []):
+            conds = ", ".join(entry.get("conds", []))
+            out.append(f"{label_spacing}{conds}:\n")
+            out.append((entry.get("body", []), indent + 2))
+
+        else_b = node.get("else_body", [])
+        if else_b:
+            out.append(f"{label_spacing}ELSE\n")
+            out.append((else_b, indent + 2))
+        out.append(f"{spacing}END_CASE;\n")
+
+    def _emit_for(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}FOR {node.get('var', '')} := ")
+        self._emit_expr(node.get("start"), out)
+        out.append(" TO ")
+        self._emit_expr(node.get("end"), out)
+        if node.get("step"):
+            out.append(" BY ")
+            self._emit_expr(node.get("step"), out)
+        out.append(" DO\n")
+        out.append((node.get("body", []), indent + 1))
+        out.append(f"{spacing}END_FOR;\n")
+
+    def _emit_while(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}WHILE ")
+        self._emit_expr(node.get("cond"), out)
+        out.append(" DO\n")
+        out.append((node.get("body", []), indent + 1))
+        out.append(f"{spacing}END_WHILE;\n")
+
+    def _emit_repeat(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}REPEAT\n")
+        out.append((node.get("body", []), indent + 1))
+        out.append(f"{spacing}UNTIL ")
+        self._emit_expr(node.get("until_cond"), out)
+        out.append(f"\n{spacing}END_REPEAT;\n")
+
+    def _emit_call_stmt(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}{node.get('func_name', '')}(")
+        self._emit_args(node.get("args", []), out)
+        out.append(");\n")
+
+    def _emit_return(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}RETURN;\n")
+
+    def _emit_exit(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}EXIT;\n")
+
+    def _emit_continue(self, node: Dict[str, Any], indent: int, spacing: str, out: list) -> None:
+        out.append(f"{spacing}CONTINUE;\n")
 
-        if expr_type == "var":
-            return expr.get("name", "")
-
-        elif expr_type == "literal":
-            return str(expr.get("value", ""))
-
-        elif expr_type == "binop":
-            left = self._expr(expr.get("left"))
-            right = self._expr(expr.get("right"))
-            op = expr.get("op", "")
-            return f"({left} {op} {right})"
-
-        elif expr_type == "unaryop":
-            op = expr.get("op", "")
-            operand = self._expr(expr.get("operand"))
-            if op.upper() == "NOT":
-                return f"NOT {operand}"
-            return f"{op}{operand}"
-
-        elif expr_type == "call":
-            func_name = expr.get("func_name", "")
-            args = [self._expr(a) for a in expr.get("args", [])]
-            return f"{func_name}({', '.join(args)})"
-
-        # 如果遇到未知的表达式，尽力将其转为字符串
-        return str(expr.get("text", ""))
+    # ==========================================
+    # 4. 表达式级还原 (Expressions)
+    # ==========================================
+    def _emit_expr(self, expr: Any, out: List[str]) -> None:
+        if expr is None: return
+        if isinstance(expr, str):
+            out.append(expr)
+            return
+        if not isinstance(expr, dict):
+            out.append(str(expr))
+            return
+
+        emitter = self._expr_emitters.get(expr.get("expr_type"))
+        if emitter is not None:
+            emitter(expr, out)
+        else:
+            # 如果遇到未知的表达式，尽力将其转为字符串
+            out.append(str(expr.get("text", "")))
+
+    def _emit_var(self, expr: Dict[str, Any], out: List[str]) -> None:
+        out.append(expr.get("name", ""))
+
+    def _emit_literal(self, expr: Dict[str, Any], out: List[str]) -> None:
+        out.append(str(expr.get("value", "")))
+
+    def _emit_binop(self, expr: Dict[str, Any], out: List[str]) -> None:
+        out.append("(")
+        self._emit_expr(expr.get("left"), out)
+        out.append(f" {expr.get('op', '')} ")
+        self._emit_expr(expr.get("right"), out)
+        out.append(")")
+
+    def _emit_unaryop(self, expr: Dict[str, Any], out: List[str]) -> None:
+        op = expr.get("op", "")
+        out.append("NOT " if op.upper() == "NOT" else op)
+        self._emit_expr(expr.get("operand"), out)
+
+    def _emit_call_expr(self, expr: Dict[str, Any], out: List[str]) -> None:
+        out.append(f"{expr.get('func_name', '')}(")
+        self._emit_args(expr.get("args", []), out)
+        out.append(")")
+
+    def _emit_args(self, args: List[Any], out: List[str]) -> None:
+        for i, a in enumerate(args):
+            if i:
+                out.append(", ")
+            self._emit_expr(a, out)
 
     # ==========================================
     # 5. 辅助方法：变量块智能聚合
     # ==========================================
     def _unparse_var_blocks(self, var_list: List[Dict], indent: int) -> str:
+        out: List[str] = []
+        self._emit_var_blocks(var_list, indent, out)
+        return "".join(out)
+
+    def _emit_var_blocks(self, var_list: List[Dict], indent: int, out: List[str]) -> None:
         """
         因为 AST 中变量是平铺的 [{"storage": "VAR", "name": "A"...}],
         我们需要把相同 storage (如 VAR_INPUT) 的变量聚合成一个块。
         """
         if not var_list:
-            return ""
+            return
 
-        spacing = "    " * indent
-        code = ""
+        spacing = self._spacing(indent)
         current_storage = None
 
         for v in var_list:
@@ -186,8 +261,8 @@ class STUnparser:
             # 遇到新的块类型（如从 VAR 切换到 VAR_INPUT）
             if storage != current_storage:
                 if current_storage is not None:
-                    code += f"{spacing}END_VAR\n"
-                code += f"{spacing}{storage}\n"
+                    out.append(f"{spacing}END_VAR\n")
+                out.append(f"{spacing}{storage}\n")
                 current_storage = storage
 
             # 渲染单个变量
@@ -195,14 +270,12 @@ class STUnparser:
             vtype = v.get("type", "INT")
             init = v.get("init_value")
 
-            line = f"{spacing}    {name} : {vtype}"
+            out.append(f"{spacing}    {name} : {vtype}")
             if init is not None:
-                line += f" := {self._expr(init)}"
-            line += ";\n"
-            code += line
+                out.append(" := ")
+                self._emit_expr(init, out)
+            out.append(";\n")
 
         # 闭合最后一个块
         if current_storage is not None:
-            code += f"{spacing}END_VAR\n"
-
-        return code
\ No newline at end of file
+            out.append(f"{spacing}END_VAR\n")
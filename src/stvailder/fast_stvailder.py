@@ -1,6 +1,25 @@
 import re
 from typing import Tuple
 
+# 模块加载时编译一次，validate 每次调用直接复用
+# 非法赋值 `\b\w+\s*=\s*\w+;` 按 "=" 锚定：正则以字面量开头时引擎会直接跳到 "=" 处，
+# 不必在每个单词上尝试匹配；左侧 "单词 + 空白" 再由 _is_illegal_assign 手工回看
+_ILLEGAL_ASSIGN_RHS_RE = re.compile(r"=\s*\w+;")
+_REQUIRED_KEYWORDS = ("FUNCTION_BLOCK", "END_FUNCTION_BLOCK", "VAR", "END_VAR")
+# 大小写不敏感匹配，不必为了查找 ARRAY[*] 先拷贝一份大写全文
+_DYNAMIC_ARRAY_RE = re.compile(r"ARRAY ?\[\*\]", re.IGNORECASE)
+
+
+def _is_illegal_assign(code: str) -> bool:
+    """是否存在 `a = b;` 形式的赋值 (与 re.search(r"\b\w+\s*=\s*\w+;") 等价)"""
+    for m in _ILLEGAL_ASSIGN_RHS_RE.finditer(code):
+        i = m.start() - 1
+        while i >= 0 and code[i].isspace():
+            i -= 1
+        if i >= 0 and (code[i].isalnum() or code[i] == "_"):
+            return True
+    return False
+
 
 class FastValidator:
     """第一层漏斗：极速文本与结构校验，拦截低级错误，节省编译器 IO 开销"""
@@ -22,8 +41,8 @@ class FastValidator:
 
 
     def validate(self, code: str) -> Tuple[bool, str]:
-        if re.search(r"\b\w+\s*=\s*\w+;", code): return False, "Illegal assignment '='"
-        required = ["FUNCTION_BLOCK", "END_FUNCTION_BLOCK", "VAR", "END_VAR"]
-        if not all(k in code for k in required): return False, "Missing structure keywords"
-        if "ARRAY[*]" in code.upper() or "ARRAY [*]" in code.upper(): return False, "Dynamic arrays not supported"
+        # 每一步先用 C 层的子串查找做廉价预判，命中后才交给正则
+        if "=" in code and _is_illegal_assign(code): return False, "Illegal assignment '='"
+        if not all(k in code for k in _REQUIRED_KEYWORDS): return False, "Missing structure keywords"
+        if "[*]" in code and _DYNAMIC_ARRAY_RE.search(code): return False, "Dynamic arrays not supported"
         return True, "Passed"
@@ -1,20 +1,58 @@
+import atexit
 import subprocess
 import tempfile
 import os
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Iterable, List, Optional, Tuple
+
+from .result_cache import ResultCache
+
+# 有 tmpfs (/dev/shm) 时把临时文件放在内存里，批量清洗时避免频繁的磁盘元数据操作
+_TMP_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+_SOURCE_NAME = "source.st"
 
 
 class MatiecValidator:
-    def __init__(self, iec2c_path: str = "iec2c", st_lib_path: str = ""):
+    def __init__(self, iec2c_path: str = "iec2c", st_lib_path: str = "", cache_size: int = 100_000):
         """
         初始化 Matiec 编译器调用器
         :param iec2c_path: iec2c 可执行文件的路径 (如果已加入环境变量，直接填 "iec2c")
         :param st_lib_path: matiec 的标准库路径 (通常在 matiec/lib/C，用于加载标准定时器、计数器等)
+        :param cache_size: 编译结果缓存的条数上限，重复的代码不再启动编译器；0 表示不缓存
         """
         self.iec2c_path = iec2c_path
         self.st_lib_path = st_lib_path
+        self._results = ResultCache(cache_size)
+        # 工作目录按线程复用：每个线程一个目录，目录内固定文件名，不再每次新建/删除临时文件与输出目录
+        self._local = threading.local()
+
+    def _workdir(self) -> str:
+        workdir = getattr(self._local, "workdir", None)
+        if workdir is None or not os.path.isdir(workdir):
+            workdir = tempfile.mkdtemp(prefix="matiec_", dir=_TMP_ROOT)
+            atexit.register(shutil.rmtree, workdir, True)
+            self._local.workdir = workdir
+        return workdir
+
+    def _init_pool_thread(self, pool_dirs: List[str]) -> None:
+        """validate_many 线程池的 initializer：工作目录随批次结束删除，不登记 atexit"""
+        workdir = tempfile.mkdtemp(prefix="matiec_", dir=_TMP_ROOT)
+        self._local.workdir = workdir
+        pool_dirs.append(workdir)
+
+    @staticmethod
+    def _clear_outputs(workdir: str) -> None:
+        """清空上一次编译的输出，只保留源文件 (下次写入时会被截断覆盖)"""
+        for entry in os.scandir(workdir):
+            if entry.name == _SOURCE_NAME:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
 
     def validate(self, st_code: str) -> Tuple[bool, str]:
         """
@@ -24,13 +62,18 @@ class MatiecValidator:
         if not st_code.strip():
             return False, "Empty code"
 
-        # 1. 创建临时 ST 文件和临时输出目录
-        # 使用 tempfile 防止多进程/多线程清洗数据时文件冲突
-        fd, temp_st_path = tempfile.mkstemp(suffix=".st", text=True)
-        out_dir = tempfile.mkdtemp(prefix="matiec_out_")
+        key = self._results.key(st_code)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        # 1. 写入 ST 源文件，输出目录就是工作目录本身
+        # 工作目录由 tempfile 创建且按线程隔离，多进程/多线程清洗数据时不会冲突
+        out_dir = self._workdir()
+        temp_st_path = os.path.join(out_dir, _SOURCE_NAME)
 
         try:
-            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            with open(temp_st_path, 'w', encoding='utf-8') as f:
                 f.write(st_code)
 
             # 2. 构造命令行指令
@@ -48,15 +91,17 @@ class MatiecValidator:
                 timeout=10  # 防止编译器死锁
             )
 
-            # 4. 判断结果
+            # 4. 判断结果 (只缓存编译器给出的确定结论，超时等偶发错误下次重试)
             if result.returncode == 0:
-                return True, "Compiled successfully"
+                verdict = True, "Compiled successfully"
             else:
                 # 提取编译器的标准输出和错误输出
                 error_msg = result.stdout.strip() + "\n" + result.stderr.strip()
                 # 简化错误信息，去掉临时文件路径，防止干扰模型
                 error_msg = error_msg.replace(temp_st_path, "source.st")
-                return False, error_msg
+                verdict = False, error_msg
+            self._results.put(key, verdict)
+            return verdict
 
         except subprocess.TimeoutExpired:
             return False, "Matiec compiler timeout"
@@ -65,8 +110,27 @@ class MatiecValidator:
         except Exception as e:
             return False, f"Unexpected error: {str(e)}"
         finally:
-            # 5. 清理临时文件 (非常重要，否则磁盘会爆)
-            if os.path.exists(temp_st_path):
-                os.remove(temp_st_path)
-            if os.path.exists(out_dir):
-                shutil.rmtree(out_dir)
\ No newline at end of file
+            # 5. 清理编译产物 (非常重要，否则磁盘会爆)；工作目录本身在进程退出时删除
+            try:
+                self._clear_outputs(out_dir)
+            except OSError:
+                pass
+
+    def validate_many(self, codes: Iterable[str], workers: Optional[int] = None) -> List[Tuple[bool, str]]:
+        """
+        批量 validate，结果与输入一一对应。
+        耗时主要在 iec2c 子进程上，等待子进程时不占 GIL，所以用线程池即可并行；
+        工作目录按线程隔离，各线程互不干扰；线程池的工作目录在本次调用返回前删除，
+        长时间运行的进程反复调用也不会在 tmpfs 上堆积目录。workers 默认取 CPU 核数。
+        """
+        codes = list(codes)
+        if workers == 1 or len(codes) < 2:
+            return [self.validate(code) for code in codes]
+        pool_dirs: List[str] = []
+        try:
+            with ThreadPoolExecutor(workers or os.cpu_count(), initializer=self._init_pool_thread,
+                                    initargs=(pool_dirs,)) as executor:
+                return list(executor.map(self.validate, codes))
+        finally:
+            for workdir in pool_dirs:
+                shutil.rmtree(workdir, ignore_errors=True)
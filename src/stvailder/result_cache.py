@@ -0,0 +1,45 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class ResultCache:
+    """
+    校验结果的 LRU 缓存，键是代码内容的 blake2b 摘要。
+    清洗数据时同一段代码经常在不同批次里重复出现，命中后直接返回上次的 (是否通过, 信息)。
+    用摘要而不是 hash(str)：后者每个进程随机化，而且缓存里不必保留完整源码。
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Tuple[bool, str]]" = OrderedDict()
+        # validate_many 会在多个线程里同时读写
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(code: str) -> bytes:
+        return hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[Tuple[bool, str]]:
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+            return result
+
+    def put(self, key: bytes, result: Tuple[bool, str]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,6 +1,129 @@
 import re
+import threading
+from collections import Counter
 
 from src.stparser import STParser
+from .result_cache import ResultCache
+
+# 可选：pyahocorasick 用 C 实现的 Aho-Corasick 自动机，一次线性扫描找出所有关键字 (pip install pyahocorasick)
+try:
+    import ahocorasick
+
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# 成对出现的关键字
+_PAIR_KEYWORDS = {
+    "IF": "END_IF",
+    "CASE": "END_CASE",
+    "FOR": "END_FOR",
+    "WHILE": "END_WHILE",
+    "REPEAT": "UNTIL",
+    "FUNCTION_BLOCK": "END_FUNCTION_BLOCK",
+    "VAR": "END_VAR",
+    "VAR_INPUT": "END_VAR",
+    "VAR_OUTPUT": "END_VAR"
+}
+
+_ALL_KEYWORDS = tuple(dict.fromkeys([*_PAIR_KEYWORDS, *_PAIR_KEYWORDS.values()]))
+# 所有正则在模块加载时编译一次。
+# 计数时把连续的非单词字符替换成两个空格，每个单词都被空格包围且相邻单词不共用空格，
+# 之后 str.count(" KW ") 在 C 层扫描即可按完整单词计数 (_ 属于单词字符，IF 不会命中 END_IF)
+_NON_WORD_RE = re.compile(r"\W+")
+# 纯 ASCII 代码走字节路径：256 项转换表一次 bytes.translate 把非单词字节映射成空格 (顺带转大写)，
+# 再由 C 实现的 split + Counter 统计单词，全程没有正则引擎和逐字符的 Python 循环
+_ASCII_WORD_TABLE = bytes(
+    c if chr(c).isalnum() or c == ord("_") else ord(" ") for c in range(128)
+).upper() + b" " * 128
+_ALL_KEYWORDS_BYTES = tuple((kw, kw.encode("ascii")) for kw in _ALL_KEYWORDS)
+
+if HAS_AHOCORASICK:
+    _KW_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _ALL_KEYWORDS:
+        _KW_AUTOMATON.add_word(_kw, _kw)
+    _KW_AUTOMATON.make_automaton()
+
+_ASSIGN_RE = re.compile(r"(?<![:<>])=(?!=)")
+_VAR_BLOCK_RE = re.compile(r"(?i)VAR.*?END_VAR", re.DOTALL)
+_VAR_DECL_RE = re.compile(r"(\w+)\s*:\s*\w+")
+
+
+# ANTLR 版 STParser 内部复用同一套词法/语法分析器，构造开销大且不是线程安全的：
+# 同一线程里的所有 STValidator 共用一个实例，不同线程各自一个
+_PARSERS = threading.local()
+
+
+def _shared_parser() -> STParser:
+    parser = getattr(_PARSERS, "parser", None)
+    if parser is None:
+        parser = _PARSERS.parser = STParser()
+    return parser
+
+
+def _strip_comments(code: str) -> str:
+    """
+    删除 // 行注释与 (* *) 块注释。
+    单趟扫描：用 str.find 在 C 层跳到下一个注释标记，注释之间的正文整段切片收集，最后 join 一次，
+    不经过正则引擎的非贪婪回溯。行注释到换行为止 (换行保留)；未闭合的 (* 按普通文本保留。
+    """
+    parts = []
+    pos = 0
+    n = len(code)
+    # 出现过一次未闭合的 (* 后，后面再也找不到 *)，只需继续处理行注释
+    blocks_open = True
+    while True:
+        line = code.find("//", pos)
+        block = code.find("(*", pos) if blocks_open else -1
+        if line < 0 and block < 0:
+            break
+        if block < 0 or 0 <= line < block:
+            parts.append(code[pos:line])
+            nl = code.find("\n", line + 2)
+            pos = n if nl < 0 else nl
+            continue
+        close = code.find("*)", block + 2)
+        if close < 0:
+            blocks_open = False
+            continue
+        parts.append(code[pos:block])
+        pos = close + 2
+    if not parts:
+        return code
+    parts.append(code[pos:])
+    return "".join(parts)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _count_keywords(upper_code: str) -> Counter:
+    """统计大写代码中各成对关键字作为完整单词出现的次数"""
+    if upper_code.isascii():
+        words = Counter(upper_code.encode("ascii").translate(_ASCII_WORD_TABLE).split())
+        return Counter({kw: words[raw] for kw, raw in _ALL_KEYWORDS_BYTES if raw in words})
+
+    if not HAS_AHOCORASICK:
+        scan = " " + _NON_WORD_RE.sub("  ", upper_code) + " "
+        counts = Counter()
+        for kw in _ALL_KEYWORDS:
+            n = scan.count(f" {kw} ")
+            if n:
+                counts[kw] = n
+        return counts
+
+    # 自动机会报告重叠命中 (END_IF 结尾处同时命中 IF)，靠前后字符的单词边界检查剔除
+    counts = Counter()
+    n = len(upper_code)
+    for end, kw in _KW_AUTOMATON.iter(upper_code):
+        start = end - len(kw) + 1
+        if start > 0 and _is_word_char(upper_code[start - 1]):
+            continue
+        if end + 1 < n and _is_word_char(upper_code[end + 1]):
+            continue
+        counts[kw] += 1
+    return counts
 
 
 # --- 校验器 ---
@@ -13,120 +136,75 @@ class STValidator:
 
     def __init__(self):
         # 定义成对出现的关键字
-        self.pair_keywords = {
-            "IF": "END_IF",
-            "CASE": "END_CASE",
-            "FOR": "END_FOR",
-            "WHILE": "END_WHILE",
-            "REPEAT": "UNTIL",
-            "FUNCTION_BLOCK": "END_FUNCTION_BLOCK",
-            "VAR": "END_VAR",
-            "VAR_INPUT": "END_VAR",
-            "VAR_OUTPUT": "END_VAR"
-        }
-        self.parser = STParser()
+        self.pair_keywords = dict(_PAIR_KEYWORDS)
+        self.parser = _shared_parser()
+        # validate 的结果按代码内容缓存，重复样本不再重新解析
+        self._results = ResultCache()
 
     def _extract_declared_vars(self, code):
         """提取 VAR 块中定义的所有变量名"""
         # 匹配 VAR...END_VAR 之间的内容
-        var_blocks = re.findall(r"(?i)VAR.*?END_VAR", code, re.DOTALL)
+        var_blocks = _VAR_BLOCK_RE.findall(code)
         declared_vars = set()
         for block in var_blocks:
             # 匹配变量定义行，如: Motor_Start : BOOL;
-            lines = re.findall(r"(\w+)\s*:\s*\w+", block)
+            lines = _VAR_DECL_RE.findall(block)
             declared_vars.update(lines)
         return declared_vars
 
-    def _check_nesting(self, code):
-        """校验结构是否完全闭合"""
-        upper_code = code.upper()
+    def _check_nesting(self, code, upper_code=None):
+        """校验结构是否完全闭合；调用方已有大写副本时可通过 upper_code 传入，省去一次全文拷贝"""
+        # 一次扫描统计全部关键字，再按字典顺序逐对比较
+        counts = _count_keywords(code.upper() if upper_code is None else upper_code)
         for start, end in self.pair_keywords.items():
-            start_count = len(re.findall(rf"\b{start}\b", upper_code))
-            end_count = len(re.findall(rf"\b{end}\b", upper_code))
+            start_count = counts[start]
+            end_count = counts[end]
             if start_count != end_count:
                 return False, f"Structural imbalance: {start}({start_count}) vs {end}({end_count})"
         return True, "Success"
 
     def validate_deprecated(self, code):
         # 1. 基础语法：禁止使用 = 进行赋值 (ST 必须使用 :=)
-        # 排除掉注释后的内容进行检查
-        clean_code = re.sub(r"//.*|(\(\*.*?\*\))", "", code, flags=re.DOTALL)
+        # 排除掉注释后的内容进行检查 (没有注释时直接返回原串)
+        clean_code = _strip_comments(code)
 
-        if re.search(r"(?<![:<>])=(?!=)", clean_code):
+        if "=" in clean_code and _ASSIGN_RE.search(clean_code):
             return False, "Assignment Error: Found '=' instead of ':=' for assignment."
 
-        # 2. 结构闭合检查
-        is_closed, nest_msg = self._check_nesting(clean_code)
+        # 2. 结构闭合检查 (大写副本只生成一次，后续检查共用)
+        upper_code = clean_code.upper()
+        is_closed, nest_msg = self._check_nesting(clean_code, upper_code)
         if not is_closed:
             return False, nest_msg
 
         # 3. 核心关键字检查
         required = ["FUNCTION_BLOCK", "VAR", "END_VAR", "END_FUNCTION_BLOCK"]
-        if not all(k in clean_code.upper() for k in required):
+        if not all(k in upper_code for k in required):
             return False, "Standard Structure Error: Missing FB or VAR declarations."
 
-        # 4. 变量存在性检查 (可选，但建议开启)
-        # 这一步可以防止模型幻觉出未定义的变量
-        declared = self._extract_declared_vars(clean_code)
-        # 简单逻辑：如果正文中有 'Variable :=' 但 'Variable' 没被定义
-        # 这里仅作演示，实际实现需排除关键字
-
-        # 5. 浮点数直接比较检查
-        if re.search(r"==|(?<![:<>])=(?!=)", clean_code) and "REAL" in clean_code.upper():
-            # 这里可以细化，提醒模型使用 ABS(a-b) < epsilon
-            pass
+        # 以下两项目前只是占位，结果不参与判定，因此不再为它们额外扫描全文：
+        # 4. 变量存在性检查 (可选，但建议开启)：防止模型幻觉出未定义的变量，
+        #    可用 self._extract_declared_vars(clean_code) 取得已声明变量，实际实现需排除关键字
+        # 5. 浮点数直接比较检查：能走到这里说明第 1 步没有找到单个 "="，剩下只可能是 "=="；
+        #    之后可以细化为提醒模型使用 ABS(a-b) < epsilon
 
         return True, "Passed All Strict Checks"
 
-    def _extract_used_vars(self, body_element) -> set:
-        """递归提取语句中使用的所有变量名"""
-        used = set()
-        if isinstance(body_element, list):
-            for item in body_element:
-                used.update(self._extract_used_vars(item))
-        elif isinstance(body_element, dict):
-            # 如果是赋值语句，target 和 expr 里的变量都要抓
-            if body_element.get("type") == "assignment":
-                used.add(body_element["target"])
-                # 这里简单处理，实际 expr 可能是复杂的树，需进一步递归
-                if isinstance(body_element["expr"], str):
-                    used.add(body_element["expr"])
-            # 如果是 IF/CASE 等结构，递归其 body 部分
-            if "body" in body_element:
-                used.update(self._extract_used_vars(body_element["body"]))
-        return used
-
     def validate(self, code: str) -> tuple[bool, str]:
-        # 1. 语法校验 (Syntax Check)
-
-        # 获取结构化数据 (Semantic Analysis)
+        key = self._results.key(code)
+        result = self._results.get(key)
+        if result is None:
+            result = self._validate(code)
+            self._results.put(key, result)
+        return result
+
+    def _validate(self, code: str) -> tuple[bool, str]:
+        # 只做语法校验：单个片段里看不到全局变量、外部 TYPE/枚举和 FB 成员，
+        # 逐名对照声明的“未定义变量”检查会把合法代码误判为错误
         try:
             struct = self.parser.get_ast(code)
         except Exception as e:
             return False, f"Analysis Error: {str(e)}"
-
-        # 3. 语义校验：变量对齐
-        # A. 收集所有声明的变量
-        declared_vars = set()
-        for block in struct.get('var_blocks', []):
-            for v in block['vars']:
-                declared_vars.add(v['name'])
-
-        # B. 递归收集正文中使用的标识符
-        used_vars = self._extract_used_vars(struct.get('body', []))
-
-        # C. 过滤掉系统关键字和常量数字
-        # 简单逻辑：如果标识符全是数字，忽略
-        used_vars = {v for v in used_vars if not v.isdigit()}
-
-        # D. 求差集：找出未定义的变量
-        undefined = used_vars - declared_vars
-
-        if undefined:
-            return False, f"Semantic Error: Undefined variables used: {', '.join(undefined)}"
-
+        if struct.get("status") != "success":
+            return False, struct.get("message", "Syntax Error")
         return True, "Passed"
-
-
-
-
@@ -1,7 +1,9 @@
 import argparse
 import os
+import tempfile
 
 from ..staugment.augment_dataset import DataAugmenter
+from ..utils_files import preshard, scan_files
 
 
 def parse_args():
@@ -14,6 +16,12 @@ def parse_args():
                         help="要处理的文件扩展名 (默认: .json)")
     parser.add_argument("-n", "--num", type=int, default=2,
                         help="每条原始数据尝试生成的最大变体数量")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="并行处理文件的进程数 (默认: CPU 核数)")
+    parser.add_argument("--pretty", action="store_true",
+                        help="输出 JSON 按 2 空格缩进 (默认紧凑格式)")
+    parser.add_argument("--preshard", action="store_true",
+                        help="先把超过 128MB 的输入切成分片再处理，输出目录按分片命名")
     return parser.parse_args()
 
 
@@ -24,10 +32,18 @@ if __name__ == "__main__":
         print(f"❌ 错误: 输入目录 '{args.input_dir}' 不存在！")
         exit(1)
 
-    augmenter = DataAugmenter(
-        input_dir=args.input_dir,
-        output_dir=args.output_dir,
-        ext=args.ext,
-        num_variants=args.num
-    )
-    augmenter.run()
\ No newline at end of file
+    with tempfile.TemporaryDirectory(prefix="augment_shards_") as shard_dir:
+        files = scan_files(args.input_dir, args.ext)
+        if args.preshard:
+            files = preshard(files, shard_dir)
+
+        augmenter = DataAugmenter(
+            input_dir=args.input_dir,
+            output_dir=args.output_dir,
+            ext=args.ext,
+            num_variants=args.num,
+            files=files,
+            workers=args.workers,
+            pretty=args.pretty
+        )
+        augmenter.run()
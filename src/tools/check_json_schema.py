@@ -3,6 +3,8 @@ import os
 import argparse
 from pathlib import Path
 
+from ..utils_files import iter_files
+
 
 def check_schema_consistency(file_path):
     expected_types = {}
@@ -42,7 +44,17 @@ def check_schema_consistency(file_path):
     return errors_found
 
 
+# 数值类型之间的变化 (int <-> float) 不算冲突，统一记为 float
+_NUMERIC_TYPES = (int, float)
+
+
+def _type_name(t):
+    # 为了输出更直观，将 dict 标记为 object
+    return 'object (dict)' if t is dict else t.__name__
+
+
 def _check_object(obj, expected_types, file_path, line_num):
+    # expected_types 记录的是类型对象本身，逐字段只做一次 is 比较；类型名只在报告冲突时才生成
     errors = 0
     if not isinstance(obj, dict):
         print(f"❌ [类型错误] {file_path} 第 {line_num} 行不是字典 (当前: {type(obj).__name__})")
@@ -53,28 +65,27 @@ def _check_object(obj, expected_types, file_path, line_num):
             continue  # 忽略 null 值
 
         current_type = type(value)
-        type_name = current_type.__name__
+        expected = expected_types.get(key)
+        if expected is current_type:
+            continue
 
-        # 为了输出更直观，将 dict 标记为 object
-        if type_name == 'dict':
-            type_name = 'object (dict)'
+        if expected is None:
+            expected_types[key] = current_type
+            continue
 
-        if key not in expected_types:
-            expected_types[key] = type_name
-        elif expected_types[key] != type_name:
-            if expected_types[key] in ['int', 'float'] and type_name in ['int', 'float']:
-                expected_types[key] = 'float'
-                continue
+        if expected in _NUMERIC_TYPES and current_type in _NUMERIC_TYPES:
+            expected_types[key] = float
+            continue
 
-            print(f"🚨 [类型突变] 发现冲突！")
-            print(f"    -> 文件: {file_path}")
-            print(f"    -> 位置: 第 {line_num} 行")
-            print(f"    -> 字段: '{key}'")
-            print(f"    -> 预期: {expected_types[key]} | 实际: {type_name}")
-            print(f"    -> 数据预览: {str(value)[:60]}...\n")
+        print(f"🚨 [类型突变] 发现冲突！")
+        print(f"    -> 文件: {file_path}")
+        print(f"    -> 位置: 第 {line_num} 行")
+        print(f"    -> 字段: '{key}'")
+        print(f"    -> 预期: {_type_name(expected)} | 实际: {_type_name(current_type)}")
+        print(f"    -> 数据预览: {str(value)[:60]}...\n")
 
-            expected_types[key] = type_name
-            errors += 1
+        expected_types[key] = current_type
+        errors += 1
 
     return errors
 
@@ -87,16 +98,19 @@ def scan_directory(directory_path):
         print(f"❌ 错误: 找不到指定的路径 '{directory_path}'")
         return
 
-    files_to_check = list(path.rglob("*.json")) + list(path.rglob("*.jsonl"))
-
-    if not files_to_check:
-        print("⚠️ 未找到任何 .json 或 .jsonl 文件。请检查路径是否正确。")
-        return
+    # 一次遍历同时匹配两种扩展名，边扫描边检查，不必先把整棵目录树的文件列表攒出来
+    files_to_check = iter_files(str(path), (".json", ".jsonl")) if path.is_dir() else ()
 
     total_errors = 0
+    found = False
     for file in files_to_check:
+        found = True
         total_errors += check_schema_consistency(file)
 
+    if not found:
+        print("⚠️ 未找到任何 .json 或 .jsonl 文件。请检查路径是否正确。")
+        return
+
     if total_errors == 0:
         print("✅ 扫描完成！所有 JSON/JSONL 文件的数据类型完全一致，未发现冲突。")
     else:
@@ -1,8 +1,10 @@
 import argparse
 
 import os
+import tempfile
 
 from ..stdatacleaner.stcleaner import STDataCleaner
+from ..utils_files import preshard, scan_files
 
 
 def parse_args():
@@ -16,6 +18,9 @@ def parse_args():
     parser.add_argument("--iec2c", type=str, default="resource/MatIEC/iec2c", help="iec2c 编译器的绝对路径 (默认: iec2c)")
     parser.add_argument("-I", "--st_lib", type=str, default="resource/MatIEC/lib", help="Matiec 标准库 lib 文件夹的路径")
     parser.add_argument("-s","--strict",type=bool, default=False,help="是否使用MatIEC编译器进行严格检查")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="并行处理文件的进程数 (默认: CPU 核数)")
+    parser.add_argument("--pretty", action="store_true", help="输出 JSON 按 2 空格缩进 (默认紧凑格式)")
+    parser.add_argument("--preshard", action="store_true", help="先把超过 128MB 的输入切成分片再处理，输出目录按分片命名")
     return parser.parse_args()
 
 
@@ -26,12 +31,20 @@ if __name__ == "__main__":
         print(f"❌ 错误: 输入目录 '{args.input_dir}' 不存在！")
         exit(1)
 
-    cleaner = STDataCleaner(
-        input_dir=args.input_dir,
-        output_dir=args.output_dir,
-        ext=args.ext,
-        iec2c_path=args.iec2c,
-        st_lib_path=args.st_lib,
-        use_matiec=args.strict
-    )
-    cleaner.run()
\ No newline at end of file
+    with tempfile.TemporaryDirectory(prefix="clean_shards_") as shard_dir:
+        files = scan_files(args.input_dir, args.ext)
+        if args.preshard:
+            files = preshard(files, shard_dir)
+
+        cleaner = STDataCleaner(
+            input_dir=args.input_dir,
+            output_dir=args.output_dir,
+            ext=args.ext,
+            iec2c_path=args.iec2c,
+            st_lib_path=args.st_lib,
+            use_matiec=args.strict,
+            workers=args.workers,
+            files=files,
+            pretty=args.pretty
+        )
+        cleaner.run()
@@ -1,33 +1,17 @@
 import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterable, List, Optional
 
+from .. import utils_json
 
-def convert_logs_to_dataset(input_path: str, output_path: str = None):
-    input_file = Path(input_path)
-    if output_path:
-        output_file = Path(output_path)
-    else:
-        # 默认保存为原文件名 + _converted
-        output_file = input_file.with_name(f"{input_file.stem}_converted.json")
-
-    print(f"📖 正在读取日志文件: {input_file} ...")
-
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-    except json.JSONDecodeError:
-        print("❌ JSON 格式错误，请检查文件是否完整")
-        return
-
-    converted_data = []
-    stats = {
-        "total_entries": len(raw_data),
-        "extracted_samples": 0,
-        "skipped_empty": 0
-    }
 
-    for entry in raw_data:
+def _extract_samples(entries, stats: dict):
+    """从日志条目中逐条产出标准格式的样本，同时更新统计"""
+    for entry in entries:
+        stats["total_entries"] += 1
         instruction = entry.get("instruction", "")
 
         # 遍历该条目下所有被拒绝的样本
@@ -43,20 +27,48 @@ def convert_logs_to_dataset(input_path: str, output_path: str = None):
                 continue
 
             # 构建标准格式
-            new_item = {
+            yield {
                 "instruction": instruction,
                 "input": "",  # ST 通常不需要 input，留空
                 "output": code,
                 # 💡 额外保留原始报错信息，方便后续分析（清洗脚本通常会忽略多余字段）
                 "original_error": error_msg
             }
-
-            converted_data.append(new_item)
             stats["extracted_samples"] += 1
 
-    # 保存文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(converted_data, f, ensure_ascii=False, indent=2)
+
+def convert_logs_to_dataset(input_path: str, output_path: str = None, indent: bool = False) -> Optional[dict]:
+    """
+    转换单个日志文件，返回统计信息；输入不是合法 JSON 时返回 None。
+    默认输出紧凑 JSON (下游的数据集加载与清洗脚本不需要缩进)，indent=True 时按 2 空格缩进便于人工查看。
+    """
+    input_file = Path(input_path)
+    if output_path:
+        output_file = Path(output_path)
+    else:
+        # 默认保存为原文件名 + _converted
+        output_file = input_file.with_name(f"{input_file.stem}_converted.json")
+
+    print(f"📖 正在读取日志文件: {input_file} ...")
+
+    stats = {
+        "total_entries": 0,
+        "extracted_samples": 0,
+        "skipped_empty": 0
+    }
+
+    # 边读边转换边写：输入按元素流式解析 (utils_json.iter_array)，转换结果逐条写出，
+    # 内存里不再同时保留整个原始日志和整个转换结果。
+    # 先写临时文件，输入解析失败时不会留下半截输出，也不会覆盖已有的输出文件
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    try:
+        with open(input_file, 'rb') as f, open(tmp_file, 'wb') as out:
+            utils_json.write_array(out, _extract_samples(utils_json.iter_array(f), stats), indent)
+    except json.JSONDecodeError:
+        tmp_file.unlink(missing_ok=True)
+        print("❌ JSON 格式错误，请检查文件是否完整")
+        return None
+    tmp_file.replace(output_file)
 
     print("\n" + "=" * 40)
     print(f"✅ 转换完成！")
@@ -66,12 +78,33 @@ def convert_logs_to_dataset(input_path: str, output_path: str = None):
     print(f"💾 输出文件: {output_file.absolute()}")
     print("=" * 40)
     print("\n👉 现在你可以把这个文件喂给 stdataclean 了！")
+    return stats
+
+
+def convert_many(input_paths: Iterable[str], workers: Optional[int] = None,
+                 indent: bool = False) -> List[Optional[dict]]:
+    """
+    批量转换多个日志分片，各自输出到默认路径，结果与输入一一对应。
+    JSON 解析与转换是 CPU 密集的纯 Python/C 扩展调用 (不释放 GIL)，这里用进程池并行。
+    """
+    input_paths = list(input_paths)
+    if workers == 1 or len(input_paths) < 2:
+        return [convert_logs_to_dataset(path, indent=indent) for path in input_paths]
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(partial(convert_logs_to_dataset, indent=indent), input_paths))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="将 failed_tasks 日志转换为标准数据集格式")
-    parser.add_argument("input_file", help="输入的 JSON 日志文件路径")
-    parser.add_argument("-o", "--output", help="输出文件路径 (可选)")
+    parser.add_argument("input_file", nargs="+", help="输入的 JSON 日志文件路径 (可以有多个)")
+    parser.add_argument("-o", "--output", help="输出文件路径 (可选，仅单个输入时有效)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="多个输入时的并行进程数 (默认: CPU 核数)")
+    parser.add_argument("--indent", action="store_true", help="输出按 2 空格缩进 (默认紧凑格式)")
 
     args = parser.parse_args()
-    convert_logs_to_dataset(args.input_file, args.output)
\ No newline at end of file
+    if len(args.input_file) == 1:
+        convert_logs_to_dataset(args.input_file[0], args.output, args.indent)
+    elif args.output:
+        parser.error("多个输入文件时不能指定 -o，输出保存在各自的默认路径")
+    else:
+        convert_many(args.input_file, args.workers, args.indent)
\ No newline at end of file
@@ -2,6 +2,8 @@ import json
 import argparse
 from pathlib import Path
 
+from .. import utils_json
+
 
 def fix_jsonl_file(input_file, output_file, target_field="last_code_snippet"):
     print(f"🔧 开始修复文件: {input_file}")
@@ -12,34 +14,39 @@ def fix_jsonl_file(input_file, output_file, target_field="last_code_snippet"):
     # 确保输出目录存在
     Path(output_file).parent.mkdir(parents=True, exist_ok=True)
 
-    with open(input_file, 'r', encoding='utf-8') as infile, \
-            open(output_file, 'w', encoding='utf-8') as outfile:
+    # 二进制模式按块读取 (utils_json.iter_lines)，解析后的行先攒在列表里，按块批量写出
+    with open(input_file, 'rb') as infile, open(output_file, 'wb') as outfile:
+        out = []
 
-        for line_num, line in enumerate(infile, 1):
-            line = line.strip()
-            if not line:
+        for line_num, line in enumerate(utils_json.iter_lines(infile), 1):
+            if not line.strip():
                 continue
 
             try:
-                data = json.loads(line)
+                data = utils_json.loads(line)
 
                 # 检查目标字段是否存在
-                if target_field in data:
-                    field_value = data[target_field]
-
-                    # 如果不是字符串（比如是 list 或 dict），强制转为 JSON 字符串
-                    if not isinstance(field_value, str) and field_value is not None:
-                        data[target_field] = json.dumps(field_value, ensure_ascii=False)
-                        fixed_count += 1
+                field_value = data.get(target_field) if isinstance(data, dict) else None
 
-                # 将处理后的数据写回新文件
-                outfile.write(json.dumps(data, ensure_ascii=False) + '\n')
+                # 如果不是字符串（比如是 list 或 dict），强制转为 JSON 字符串，再序列化写回
+                if not isinstance(field_value, str) and field_value is not None:
+                    data[target_field] = utils_json.dumps(field_value)
+                    fixed_count += 1
+                    out.append(utils_json.dumps_bytes(data) + b'\n')
+                else:
+                    # 不需要修复的行 (绝大多数) 已经校验过是合法 JSON，原样写出，省掉一次重新序列化
+                    out.append(line.strip() + b'\n')
+                if len(out) >= 4096:
+                    outfile.write(b''.join(out))
+                    out.clear()
 
             except json.JSONDecodeError as e:
                 print(f"❌ [跳过] 第 {line_num} 行不是合法的 JSON，无法修复: {e}")
                 error_count += 1
                 # 遇到彻底损坏的行，你可以选择原样写入，或者直接丢弃（这里选择丢弃并报错）
 
+        outfile.write(b''.join(out))
+
     print("-" * 30)
     print(f"✅ 修复完成！")
     print(f"-> 成功将 {fixed_count} 处异常的 '{target_field}' 转换为字符串。")
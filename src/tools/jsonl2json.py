@@ -2,6 +2,8 @@ import json
 import argparse
 from pathlib import Path
 
+from .. import utils_json
+
 
 def convert_jsonl_to_json(input_path: str, output_path: str = None):
     input_file = Path(input_path)
@@ -19,12 +21,12 @@ def convert_jsonl_to_json(input_path: str, output_path: str = None):
             if not line:
                 continue
             try:
-                data.append(json.loads(line))
+                data.append(utils_json.loads(line))
             except json.JSONDecodeError as e:
                 print(f"⚠️ 跳过第 {line_num} 行 (格式错误): {e}")
 
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        utils_json.dump(data, f, indent=True)
 
     print(f"✅ 转换完成！共 {len(data)} 条记录。")
     print(f"💾 已保存至: {output_file.absolute()}")
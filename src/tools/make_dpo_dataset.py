@@ -1,7 +1,8 @@
-import json
 import argparse
 from pathlib import Path
 
+from .. import utils_json
+
 
 def create_dpo_negatives(error_file_path: str, output_path: str):
     """
@@ -16,7 +17,7 @@ def create_dpo_negatives(error_file_path: str, output_path: str):
         return
 
     with open(in_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        data = utils_json.load(f)
 
     dpo_dataset = []
 
@@ -44,9 +45,8 @@ def create_dpo_negatives(error_file_path: str, output_path: str):
         dpo_dataset.append(dpo_record)
 
     # 保存为标准的 JSONL 格式 (HuggingFace 默认偏好)
-    with open(out_file, 'w', encoding='utf-8') as f:
-        for record in dpo_dataset:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # 各条记录直接序列化成 UTF-8 字节，拼接后一次写入，不再逐条经过文本层编码和 write 调用
+    out_file.write_bytes(b"".join(utils_json.dumps_bytes(record) + b"\n" for record in dpo_dataset))
 
     print(f"✅ 成功提取 {len(dpo_dataset)} 条 DPO 负样本！")
     print(f"📁 已保存至: {out_file}")
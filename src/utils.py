@@ -1,32 +1,57 @@
 import re
 
+# 可选：第三方 regex 模块支持 (*SKIP)(*FAIL)，去注释时跳过字符串不需要 Python 回调 (pip install regex)
+try:
+    import regex
+
+    HAS_REGEX = True
+except ImportError:
+    HAS_REGEX = False
+
+# 正则在模块加载时编译一次：auto_repair 在数据清洗/增强时逐样本调用，
+# 不再每次经过 re 模块的模式缓存查找
+# Markdown 代码块
+_MD_RE = re.compile(r"```[a-zA-Z]*\n(.*?)```", re.IGNORECASE | re.DOTALL)
+# 开头就是 Python/自然语言等完全不相关的内容
+_JUNK_RE = re.compile(r'^(variables|import|def\s|class\s|#\s)', re.I)
+# 模式说明：
+# 1. 单引号字符串 '...'
+# 2. 双引号字符串 "..."
+# 3. 单行注释 //...
+# 4. 多行注释 (*...*)
+# 注意：这里继续使用 re.DOTALL 保证多行注释正常工作
+_COMMENT_RE = re.compile(r"('[^']*'|\"[^\"]*\")|(//[^\r\n]*|\(\*.*?\*\))", re.DOTALL)
+# regex 版本：字符串命中后 (*SKIP)(*FAIL) 直接跳过，只有注释会被替换成空串，整个替换都在 C 层完成
+_COMMENT_SKIP_RE = regex.compile(
+    r"(?:'[^']*'|\"[^\"]*\")(*SKIP)(*FAIL)|//[^\r\n]*|\(\*.*?\*\)", regex.DOTALL
+) if HAS_REGEX else None
+
 
 def auto_repair(code_text: str) -> str:
     if not code_text: return ""
-    md_match = r"```[a-zA-Z]*\n(.*?)```"
-    match = re.search(md_match, code_text, flags=re.IGNORECASE | re.DOTALL)
+    # 没有代码围栏的输出 (多数情况) 用一次子串查找排除，不进正则引擎
+    match = _MD_RE.search(code_text) if "```" in code_text else None
     code = match.group(1).strip() if match else code_text.strip()
 
     # --- Step 2: 过滤完全不相关的垃圾 ---
-    if re.search(r'^(variables|import|def\s|class\s|#\s)', code, re.I):
+    if _JUNK_RE.search(code):
         return ""
 
     return code
 
-def remove_st_comments(code: str) -> str:
-    # 模式说明：
-    # 1. 单引号字符串 '...'
-    # 2. 双引号字符串 "..."
-    # 3. 单行注释 //...
-    # 4. 多行注释 (*...*)
-    pattern = r"('[^']*'|\"[^\"]*\")|(//[^\r\n]*|\(\*.*?\*\))"
-
-    def replacer(match):
-        # 如果是 group(1) 命中了，说明是字符串，原样返回
-        if match.group(1):
-            return match.group(1)
-        # 否则是 group(2) 命中了，说明是注释，替换为空
-        return ""
 
-    # 注意：这里继续使用 re.DOTALL 保证多行注释正常工作
-    return re.sub(pattern, replacer, code, flags=re.DOTALL).upper()
\ No newline at end of file
+def _keep_strings(match):
+    # 如果是 group(1) 命中了，说明是字符串，原样返回
+    if match.group(1):
+        return match.group(1)
+    # 否则是 group(2) 命中了，说明是注释，替换为空
+    return ""
+
+
+def remove_st_comments(code: str) -> str:
+    # 没有注释起始符时正则只会原样保留字符串，直接跳过替换
+    if "//" not in code and "(*" not in code:
+        return code.upper()
+    if HAS_REGEX:
+        return _COMMENT_SKIP_RE.sub("", code).upper()
+    return _COMMENT_RE.sub(_keep_strings, code).upper()
@@ -0,0 +1,52 @@
+"""
+数据集工具共用的文件收集与预分片。
+"""
+import json
+import os
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from . import utils_json
+
+# 预分片的默认大小：单个文件超过它时切成约这么大的分片，进程池按分片调度
+SHARD_BYTES = 128 << 20
+
+
+def iter_files(root: str, ext: Union[str, Tuple[str, ...]]) -> Iterator[str]:
+    """
+    递归遍历 root，边走边产出扩展名为 ext (可以是元组) 的文件，不等整棵目录树扫完。
+    os.scandir 的 DirEntry 自带目录项类型，判断文件/目录不需要逐个 stat。
+    与 Path.rglob 一致：指向文件的符号链接照常收集，不进入符号链接目录；root 不是目录时不产出任何文件。
+    """
+    if not os.path.isdir(root):
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(ext) and entry.is_file():
+                    yield entry.path
+
+
+def scan_files(root: str, ext: Union[str, Tuple[str, ...]]) -> List[str]:
+    """递归收集 root 下扩展名为 ext 的文件，结果按路径排序保证顺序稳定"""
+    return sorted(iter_files(root, ext))
+
+
+def preshard(files: Iterable[str], shard_dir: str, max_bytes: int = SHARD_BYTES) -> List[str]:
+    """
+    把超过 max_bytes 的 JSON 数组文件切成分片写到 shard_dir，返回替换后的文件列表。
+    少数几个超大文件会让进程池里一个进程独自处理、其余空等，切成分片后各进程负载均衡。
+    解析失败或顶层不是数组的文件原样保留，由后续处理照常报告。
+    """
+    result = []
+    for path in files:
+        if os.path.getsize(path) > max_bytes:
+            try:
+                result.extend(utils_json.split_array(path, shard_dir, max_bytes))
+                continue
+            except json.JSONDecodeError:
+                pass
+        result.append(path)
+    return result
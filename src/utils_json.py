@@ -0,0 +1,169 @@
+"""
+JSON 编解码的统一入口：安装了 orjson (C + SIMD 实现) 时用它，否则退回标准库 json。
+两种实现的输出一致：中文按 UTF-8 原样输出；不缩进时是紧凑格式 (分隔符不带空格)，
+缩进时与 json.dumps(..., indent=2) 相同。
+解码失败抛出的 orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方的 except 不用改。
+"""
+import io
+import itertools
+import json
+import mmap
+import os
+from typing import IO, Any, Iterable, Iterator, List, Union
+
+# 可选：orjson 编解码比标准库快数倍 (pip install orjson)
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 可选：ijson 流式解析大 JSON 数组，不必一次性把整个文件读进内存 (pip install ijson)
+try:
+    import ijson
+
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(f: IO) -> Any:
+    """
+    从已打开的文件 (文本或二进制模式) 读取整个 JSON 文档。
+    orjson + 从头读取的二进制文件时用 mmap 映射后直接解析，省掉把整个文件复制成 bytes 的一份内存。
+    """
+    mm = None
+    if HAS_ORJSON and "b" in getattr(f, "mode", ""):
+        try:
+            if f.tell() == 0:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            # 管道、空文件等无法映射，退回整体读取
+            pass
+    if mm is None:
+        return loads(f.read())
+    with mm, memoryview(mm) as view:
+        return orjson.loads(view)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节串；indent=True 时按 2 空格缩进"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return dumps(obj, indent).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    if HAS_ORJSON:
+        return dumps_bytes(obj, indent).decode("utf-8")
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dump(obj: Any, f: IO[str], indent: bool = False) -> None:
+    f.write(dumps(obj, indent))
+
+
+def iter_lines(f: IO[bytes], chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    按块读取二进制文件并逐行产出 (不含换行符)，供 JSONL 解析使用。
+    每次读 chunk_size 字节，由 bytes.split 在 C 层 (memchr) 切行，跳过文本层解码与逐行 readline；
+    跨块的半行留到下一块拼接。行内容原样返回，去空白与解码交给调用方 (loads 可以直接吃 bytes)。
+    """
+    tail = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b"\n") if tail else chunk.split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def iter_array(f: IO[bytes]) -> Iterator[Any]:
+    """
+    逐个产出顶层 JSON 数组的元素。安装了 ijson 时边读边解析，内存里只保留当前元素；
+    否则退回整体 load。解析失败或顶层不是数组时统一抛出 json.JSONDecodeError。
+    """
+    if not HAS_IJSON:
+        data = load(f)
+        if not isinstance(data, list):
+            raise json.JSONDecodeError("top-level JSON value is not an array", "", 0)
+        yield from data
+        return
+    try:
+        # ijson.items 遇到顶层不是数组时什么都不产出也不报错，先看第一个事件再交给 items
+        events = ijson.parse(f, use_float=True)
+        first = next(events, None)
+        if first is None or first[1] != "start_array":
+            raise json.JSONDecodeError("top-level JSON value is not an array", "", 0)
+        yield from ijson.items(itertools.chain((first,), events), "item")
+    except ijson.JSONError as e:
+        raise json.JSONDecodeError(str(e), "", 0) from e
+
+
+def write_array(f: IO[bytes], items: Iterable[Any], indent: bool = True) -> int:
+    """
+    把 items 逐个写成 JSON 数组 (二进制文件)，格式与 dumps(list(items), indent) 完全一致，
+    但不需要先在内存里攒出整个列表。返回写入的元素个数。
+    """
+    count = 0
+    if not indent:
+        for item in items:
+            f.write(b"[" if count == 0 else b",")
+            f.write(dumps_bytes(item))
+            count += 1
+        f.write(b"]" if count else b"[]")
+        return count
+
+    for item in items:
+        # 元素自身按 2 空格缩进后整体再缩进一级；字符串里的换行已被转义，不会被误替换
+        f.write(b"[\n  " if count == 0 else b",\n  ")
+        f.write(dumps_bytes(item, indent=True).replace(b"\n", b"\n  "))
+        count += 1
+    f.write(b"\n]" if count else b"[]")
+    return count
+
+
+def split_array(path: str, out_dir: str, max_bytes: int = 128 << 20) -> List[str]:
+    """
+    把顶层是 JSON 数组的大文件按大约 max_bytes 一片切成多个紧凑格式的分片 (<原文件名>.partNNN.json)，
+    返回分片路径。输入经 iter_array 流式读取，每个元素只序列化一次；空数组不产生分片。
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    shards: List[str] = []
+    out = None
+    size = 0
+    try:
+        with open(path, "rb") as f:
+            for item in iter_array(f):
+                data = dumps_bytes(item)
+                if out is None or size >= max_bytes:
+                    if out is not None:
+                        out.write(b"]")
+                        out.close()
+                    shard = os.path.join(out_dir, f"{stem}.part{len(shards):03d}.json")
+                    shards.append(shard)
+                    out = open(shard, "wb")
+                    out.write(b"[")
+                    size = 1
+                else:
+                    out.write(b",")
+                    size += 1
+                out.write(data)
+                size += len(data)
+    finally:
+        if out is not None:
+            out.write(b"]")
+            out.close()
+    return shards
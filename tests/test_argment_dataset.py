@@ -1,3 +1,5 @@
+import json
+
 from src.staugment import *
 
 def test_argment_dataset():
@@ -7,4 +9,42 @@ def test_argment_dataset():
         ext=".json",
         num_variants=3
     )
-    augmenter.run()
\ No newline at end of file
+    augmenter.run()
+
+def _write_shards(tmp_path, n=3):
+    src = tmp_path / "in"
+    src.mkdir()
+    for i in range(n):
+        items = [{"instruction": f"t{i}", "output": f"PROGRAM P\nVAR a : INT; b : INT; END_VAR\na := b + {i};\nb := a * 2;\nEND_PROGRAM"},
+                 {"instruction": "bad", "output": "PROGRAM P a := ; END_PROGRAM"}]
+        (src / f"shard{i}.json").write_text(json.dumps(items), encoding="utf-8")
+    return src
+
+
+def test_augment_workers(tmp_path):
+    src = _write_shards(tmp_path)
+    stats = []
+    for workers in (1, 2):
+        augmenter = DataAugmenter(input_dir=str(src), output_dir=str(tmp_path / f"out{workers}"), workers=workers)
+        augmenter.run()
+        stats.append({k: augmenter.stats[k] for k in ("total_files", "processed_files", "total_original", "parse_errors")})
+        raw = (tmp_path / f"out{workers}" / "shard2" / "augmented_golden.json").read_bytes()
+        # 默认输出紧凑格式
+        assert b"\n  " not in raw
+        out = json.loads(raw)
+        # 变体紧跟在原样本之后
+        assert out[0]["instruction"] == "t2" and out[-1]["instruction"] == "bad"
+        assert all(item.get("is_augmented") for item in out[1:-1])
+    assert stats[0] == stats[1] == {"total_files": 3, "processed_files": 3, "total_original": 6, "parse_errors": 3}
+
+
+def test_augment_parses_duplicates_once(tmp_path):
+    src = _write_shards(tmp_path, n=2)
+    augmenter = DataAugmenter(input_dir=str(src), output_dir=str(tmp_path / "out"), workers=1)
+    calls = []
+    get_ast = augmenter.parser.get_ast
+    augmenter.parser.get_ast = lambda code: calls.append(code) or get_ast(code)
+    augmenter.run()
+    # 两个分片里的坏样本相同，只解析一次；解析失败照样计数
+    assert len(calls) == 3
+    assert augmenter.stats["parse_errors"] == 2
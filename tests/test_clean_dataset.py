@@ -1,3 +1,5 @@
+import json
+
 from src.stdatacleaner import STDataCleaner
 
 def test_clean_dataset():
@@ -14,4 +16,46 @@ def test_clean_dataset_demo():
         output_dir="../data/st_dataset_distillation_by_st_coder_clean",
         ext=".json"
     )
-    cleaner.run()
\ No newline at end of file
+    cleaner.run()
+
+def test_clean_dataset_workers(tmp_path):
+    # 模拟 iec2c：源码含 BAD 时报错
+    iec2c = tmp_path / "iec2c"
+    iec2c.write_text('#!/bin/sh\nfor f; do :; done\nif grep -q BAD "$f"; then echo "$f:1: error"; exit 1; fi\n')
+    iec2c.chmod(0o755)
+    src = tmp_path / "in"
+    src.mkdir()
+    good = "FUNCTION_BLOCK F\nVAR x : INT; END_VAR\nx := 1;\nEND_FUNCTION_BLOCK"
+    for i in range(3):
+        items = [{"output": good}, {"output": good.replace("x := 1", "BAD := 1")}, {"output": "x = 1;"}, {"output": ""}]
+        (src / f"shard{i}.json").write_text(json.dumps(items), encoding="utf-8")
+
+    results = []
+    for workers in (1, 2):
+        out = tmp_path / f"out{workers}"
+        cleaner = STDataCleaner(input_dir=str(src), output_dir=str(out), iec2c_path=str(iec2c),
+                                use_matiec=True, workers=workers)
+        cleaner.run()
+        results.append((cleaner.stats, sorted(p.relative_to(out).as_posix() for p in out.rglob("*.json"))))
+    assert results[0] == results[1]
+    stats, files = results[0]
+    assert (stats["golden"], stats["syntax_error"], stats["basic_error"], stats["empty"]) == (3, 3, 3, 3)
+    assert "shard0/golden.json" in files
+
+
+def test_clean_dataset_without_matiec(tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    good = "FUNCTION_BLOCK F\nVAR x : INT; END_VAR\nx := 1;\nEND_FUNCTION_BLOCK"
+    # 第三条能通过 FastValidator，但无法解析
+    items = [{"output": good}, {"output": "x = 1;"}, {"output": good.replace("x := 1", "x := ")}]
+    # 成员访问、数组下标、大小写不同、外部枚举值、外部全局变量都是合法代码，应归入 golden
+    for decl, body in [("t : TON; q : BOOL;", "q := t.Q;"), ("a : ARRAY[1..3] OF INT; q : INT;", "q := a[1];"),
+                       ("X : INT;", "x := X;"), ("s : E_State;", "s := IDLE;"), ("x : INT;", "x := g;")]:
+        items.append({"output": f"FUNCTION_BLOCK F\nVAR {decl} END_VAR\n{body}\nEND_FUNCTION_BLOCK"})
+    (src / "a.json").write_text(json.dumps(items), encoding="utf-8")
+    cleaner = STDataCleaner(input_dir=str(src), output_dir=str(tmp_path / "out"), workers=1)
+    cleaner.run()
+    assert (cleaner.stats["golden"], cleaner.stats["basic_error"], cleaner.stats["syntax_error"]) == (6, 1, 1)
+    errors = json.loads((tmp_path / "out" / "a" / "syntax_error.json").read_text(encoding="utf-8"))
+    assert errors[0]["st_metadata"]["error"].startswith("Syntax Errors:")
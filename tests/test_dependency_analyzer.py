@@ -0,0 +1,71 @@
+from src.stanalyzer import DependencyAnalyzer
+from src.stparser.anltr4.parser import STParser
+
+
+CODE = """PROGRAM P
+VAR a : INT; b : INT; c : BOOL; i : INT; END_VAR
+IF a > 1 AND c THEN b := a * 2; ELSIF b < 0 THEN a := -b; ELSE c := NOT c; END_IF;
+FOR i := 1 TO a DO b := b + i; END_FOR;
+foo(x := c, y := a + 1);
+END_PROGRAM
+"""
+
+
+def _body():
+    result = STParser().get_ast(CODE)
+    assert result["status"] == "success", result.get("message")
+    return result["ast"][0]["body"]
+
+
+def test_read_write_vars():
+    analyzer = DependencyAnalyzer()
+    if_stmt, for_stmt, call_stmt = _body()
+    assert analyzer.get_read_vars(if_stmt) == {"a", "b", "c"}
+    assert analyzer.get_write_vars(if_stmt) == {"a", "b", "c"}
+    assert analyzer.get_read_vars(for_stmt) == {"a", "b", "i"}
+    assert analyzer.get_write_vars(for_stmt) == {"b", "i"}
+    assert analyzer.get_read_vars(call_stmt) == {"a", "c"}
+    assert analyzer.get_write_vars(call_stmt) == set()
+
+
+def test_deep_nesting():
+    # 远超默认递归上限的嵌套深度
+    node = {"stmt_type": "assign", "target": {"expr_type": "var", "name": "x"},
+            "value": {"expr_type": "var", "name": "y"}}
+    for _ in range(5000):
+        node = {"stmt_type": "while", "cond": {"expr_type": "var", "name": "c"}, "body": [node]}
+    analyzer = DependencyAnalyzer()
+    assert analyzer.get_read_vars(node) == {"c", "y"}
+    assert analyzer.get_write_vars(node) == {"x"}
+
+
+def test_cache():
+    analyzer = DependencyAnalyzer()
+    body = _body()
+    first = analyzer.get_write_vars(body)
+    assert isinstance(first, frozenset)
+    assert analyzer.get_write_vars(body) is first
+    assert first == {"a", "b", "c", "i"}
+    # 原地修改 AST 后缓存仍是旧结果，需要手动失效
+    body.pop(0)
+    assert analyzer.get_write_vars(body) == {"a", "b", "c", "i"}
+    analyzer.reset_cache()
+    assert analyzer.get_write_vars(body) == {"b", "i"}
+    assert analyzer.get_read_vars(body) == {"a", "b", "c", "i"}
+
+
+def test_rw_vars():
+    analyzer = DependencyAnalyzer()
+    for stmt in _body():
+        expected = (analyzer.get_read_vars(stmt), analyzer.get_write_vars(stmt))
+        assert DependencyAnalyzer().get_rw_vars(stmt) == expected
+        # 命中读/写缓存时直接返回
+        assert analyzer.get_rw_vars(stmt) == expected
+
+
+def test_small_sets_are_shared():
+    analyzer = DependencyAnalyzer()
+    if_stmt, for_stmt, call_stmt = _body()
+    # 内容相同的小集合只保留一份
+    assert analyzer.get_read_vars(if_stmt) is analyzer.get_write_vars(if_stmt)
+    assert analyzer.get_write_vars(call_stmt) == frozenset()
@@ -0,0 +1,111 @@
+import pytest
+
+from src.stparser.lark.parser import STParser, STParseError
+from src.stanalyzer.lark_analyzer import STSemanticAnalyzer, VarDecl
+
+
+def _body(code: str):
+    result = STParser().get_ast(f"PROGRAM P\nVAR c : INT; END_VAR\n{code}\nEND_PROGRAM")
+    assert result["status"] == "success", result.get("message")
+    return result["ast"].children[-2]
+
+
+def test_typed_literals():
+    for literal in ["DINT#0", "T#1s", "DINT#-1", "16#FF", "DINT#16#FF", "TIME#1.5s"]:
+        body = _body(f"c := {literal};")
+        assert body[0]["expr"] == {"type": "literal", "value": literal}
+
+
+def test_block_comment_is_ignored():
+    body = _body("(* first\n  multi-line *)\nc := 1; (* trailing *)")
+    assert len(body) == 1
+    assert body[0]["target"] == "c"
+
+
+def test_operator_precedence():
+    expr = _body("c := a > 1 + 2 * b AND NOT d OR e - f - g;")[0]["expr"]
+    assert expr["op"] == "OR"
+    left, right = expr["left"], expr["right"]
+    assert left["op"] == "AND"
+    assert left["left"]["op"] == ">"
+    assert left["left"]["right"]["op"] == "+"
+    assert left["left"]["right"]["right"]["op"] == "*"
+    assert left["right"] == {"type": "unary_op", "op": "NOT", "operand": {"type": "variable", "name": "d"}}
+    # 同级减法保持左结合: (e - f) - g
+    assert right["op"] == "-" and right["left"]["op"] == "-"
+    assert right["right"] == {"type": "variable", "name": "g"}
+    # 比较运算可以连写，同样左结合: (a < b) < d
+    chained = _body("c := a < b < d;")[0]["expr"]
+    assert chained["op"] == "<" and chained["left"]["op"] == "<"
+    assert chained["right"] == {"type": "variable", "name": "d"}
+
+
+def test_read_vars_cache():
+    analyzer = STSemanticAnalyzer()
+    body = _body("c := a + b;\nfoo(x := c, y := d);")
+    first = analyzer.get_read_vars(body)
+    # 返回不可变集合，命中缓存时直接复用同一个对象
+    assert isinstance(first, frozenset)
+    assert analyzer.get_read_vars(body) is first
+    assert first == {"a", "b", "c", "d"}
+    # 语句级结果也会被整块复用
+    assert analyzer.get_read_vars(body[1]) == {"c", "d"}
+    analyzer.reset_cache()
+    assert analyzer.get_read_vars(body[0]) == {"a", "b"}
+
+
+def test_parse_error():
+    parser = STParser()
+    with pytest.raises(STParseError):
+        parser.parse("PROGRAM P c := ; END_PROGRAM")
+    result = parser.get_ast("PROGRAM P c := ; END_PROGRAM")
+    assert result["status"] == "error"
+    assert "line 1" in result["message"]
+
+
+def test_var_block_kind():
+    result = STParser().get_ast(
+        "PROGRAM P\nvar_input a : INT; END_VAR\nVAR CONSTANT k : INT := 1; END_VAR\nc := a;\nEND_PROGRAM"
+    )
+    assert result["status"] == "success", result.get("message")
+    inputs, consts = result["ast"].children[2:4]
+    assert inputs == {"kind": "VAR_INPUT", "vars": [VarDecl("a", "INT")]}
+    assert consts["kind"] == "VAR" and consts["qualifier"] == "CONSTANT"
+    assert [v.name for v in consts["vars"]] == ["k"]
+
+
+def test_rw_vars():
+    analyzer = STSemanticAnalyzer()
+    body = _body("c := a + b;\nfoo(x := c, y := d);")
+    assert analyzer.get_rw_vars(body) == ({"a", "b", "c", "d"}, {"c"})
+    assert analyzer.get_write_vars(body) == {"c"}
+    assert analyzer.get_rw_vars(body[1]) == ({"c", "d"}, set())
+
+
+def test_parse_many():
+    codes = [f"PROGRAM P\nVAR c : INT; END_VAR\nc := a + {i};\nEND_PROGRAM" for i in range(4)]
+    codes.append("PROGRAM P c := ; END_PROGRAM")
+    serial = STParser.parse_many(codes, workers=1)
+    assert STParser.parse_many(codes, workers=2, chunksize=1) == serial
+    assert [r["status"] for r in serial] == ["success"] * 4 + ["error"]
+    assert serial[3]["ast"].children[-2][0]["expr"]["right"] == {"type": "literal", "value": "3"}
+
+
+def test_get_interface():
+    code = "program Main\nVAR_INPUT a : INT; END_VAR\nVAR k : INT := 1 + 2; END_VAR\nc := a;\nEND_PROGRAM"
+    parser = STParser()
+    interface = parser.get_interface(code)
+    assert interface["status"] == "success"
+    assert interface["unit_type"] == "PROGRAM" and interface["name"] == "Main"
+    assert interface["var_blocks"] == parser.get_ast(code)["ast"].children[2:4]
+    assert parser.get_interface("PROGRAM P c := ; END_PROGRAM")["status"] == "error"
+
+
+def test_analyze():
+    reads, writes = STParser().analyze(
+        "PROGRAM P\nVAR c : INT := k; END_VAR\nc := a + b;\nfoo(x := c);\n"
+        "IF a > 1 THEN b := c; END_IF;\nFOR i := 1 TO n DO s := s + i; END_FOR;\nEND_PROGRAM"
+    )
+    # 声明里的初值不属于正文
+    assert reads == {"a", "b", "c", "n", "s", "i"}
+    assert writes == {"c", "b", "i", "s"}
@@ -0,0 +1,83 @@
+import os
+
+from src.stvailder import MatiecValidator, matiec_validator
+from src.stvailder.result_cache import ResultCache
+
+
+def _fake_iec2c(tmp_path):
+    # 模拟 iec2c：在 -T 指定的目录写出产物，源码含 BAD 时报错
+    script = tmp_path / "iec2c"
+    script.write_text(
+        '#!/bin/sh\nout=$2\nfor f; do :; done\n'
+        'touch "$out/POUS.c"; mkdir -p "$out/sub"\n'
+        'if grep -q BAD "$f"; then echo "$f:1: error"; exit 1; fi\n'
+    )
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_validate_reuses_workdir(tmp_path):
+    validator = MatiecValidator(_fake_iec2c(tmp_path))
+    assert validator.validate("PROGRAM P END_PROGRAM") == (True, "Compiled successfully")
+    workdir = validator._workdir()
+    ok, msg = validator.validate("BAD")
+    # 报错信息里的临时路径被替换成 source.st
+    assert not ok and msg.startswith("source.st:1: error")
+    # 同一线程复用工作目录，编译产物每次都会清掉
+    assert validator._workdir() == workdir
+    assert os.listdir(workdir) == ["source.st"]
+    assert validator.validate("  ") == (False, "Empty code")
+
+
+def test_compiler_not_found(tmp_path):
+    validator = MatiecValidator(str(tmp_path / "missing"))
+    assert validator.validate("x") == (False, "Matiec compiler (iec2c) not found. Please check PATH.")
+
+
+def test_validate_many(tmp_path):
+    validator = MatiecValidator(_fake_iec2c(tmp_path))
+    codes = ["PROGRAM P END_PROGRAM", "BAD", "", "PROGRAM Q END_PROGRAM"] * 3
+    results = validator.validate_many(codes, workers=4)
+    assert results == validator.validate_many(codes, workers=1)
+    assert [ok for ok, _ in results] == [True, False, False, True] * 3
+
+
+def test_validate_many_removes_pool_workdirs(tmp_path, monkeypatch):
+    root = tmp_path / "shm"
+    root.mkdir()
+    monkeypatch.setattr(matiec_validator, "_TMP_ROOT", str(root))
+    validator = MatiecValidator(_fake_iec2c(tmp_path), cache_size=0)
+    for _ in range(3):
+        validator.validate_many(["PROGRAM P END_PROGRAM", "BAD"] * 4, workers=4)
+    # 每批结束后线程池的工作目录都已删除
+    assert os.listdir(root) == []
+
+
+def test_results_cached_by_content(tmp_path):
+    compiler = _fake_iec2c(tmp_path)
+    calls = tmp_path / "calls"
+    # 包一层记录调用次数
+    wrapper = tmp_path / "iec2c_counting"
+    wrapper.write_text(f'#!/bin/sh\necho x >> "{calls}"\nexec "{compiler}" "$@"\n')
+    wrapper.chmod(0o755)
+
+    validator = MatiecValidator(str(wrapper))
+    for _ in range(3):
+        assert validator.validate("PROGRAM P END_PROGRAM")[0]
+        assert not validator.validate("BAD")[0]
+    assert len(calls.read_text().splitlines()) == 2
+
+    uncached = MatiecValidator(str(wrapper), cache_size=0)
+    uncached.validate("BAD")
+    uncached.validate("BAD")
+    assert len(calls.read_text().splitlines()) == 4
+
+
+def test_result_cache_evicts_least_recent():
+    cache = ResultCache(maxsize=2)
+    a, b, c = (ResultCache.key(code) for code in "abc")
+    cache.put(a, (True, "a"))
+    cache.put(b, (True, "b"))
+    assert cache.get(a) == (True, "a")
+    cache.put(c, (False, "c"))
+    assert cache.get(b) is None and cache.get(a) and len(cache) == 2
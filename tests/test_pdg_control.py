@@ -0,0 +1,28 @@
+from src.stslicer.pdg.control import PDGControlBuilder
+
+
+def _nonempty(deps):
+    return {k: v for k, v in deps.items() if v}
+
+
+def test_nested_branches():
+    # 0: IF ... 1: IF ... 2 / 3 ... END_IF 4 ... END_IF 5，6 为虚拟出口
+    succ = {0: [1, 5], 1: [2, 3], 2: [4], 3: [4], 4: [5], 5: [6], 6: []}
+    builder = PDGControlBuilder(succ, exit_id=6)
+    assert builder._compute_ipostdom() == {0: 5, 1: 4, 2: 4, 3: 4, 4: 5, 5: 6, 6: 6}
+    assert _nonempty(builder.build()) == {0: {1, 4}, 1: {2, 3}}
+
+
+def test_loop():
+    # 0: WHILE c DO 1 END_WHILE; 2，3 为虚拟出口
+    succ = {0: [1, 2], 1: [0], 2: [3], 3: []}
+    assert _nonempty(PDGControlBuilder(succ, exit_id=3).build()) == {0: {0, 1}}
+
+
+def test_long_straight_line():
+    # 远超默认递归上限的顺序语句链，末尾一个分支
+    n = 5000
+    succ = {i: [i + 1] for i in range(n)}
+    succ[n - 2] = [n - 1, n]
+    succ[n] = []
+    assert _nonempty(PDGControlBuilder(succ, exit_id=n).build()) == {n - 2: {n - 1}}
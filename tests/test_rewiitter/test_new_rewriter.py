@@ -0,0 +1,118 @@
+import copy
+import random
+
+from src.stanalyzer import DependencyAnalyzer
+from src.stparser.anltr4.parser import STParser
+from src.strewriter import STRewriter
+from src.strewriter.new_st_rewritter import _clone_tree
+
+
+CODE = """PROGRAM P
+VAR a : INT; b : INT; c : BOOL; END_VAR
+a := b + 1;
+IF c THEN b := a * 2; ELSE c := NOT c; END_IF;
+END_PROGRAM
+"""
+
+
+def test_shared_children_rewritten_once():
+    parser = STParser()
+    for seed in range(20):
+        random.seed(seed)
+        result = parser.get_ast(CODE)
+        assert result["status"] == "success", result.get("message")
+        pou = STRewriter(DependencyAnalyzer()).rewrite(result["ast"][0])
+        for stmt in pou["body"]:
+            # ast_to_dict 的别名键在重写后仍指向同一个对象
+            if stmt["stmt_type"] == "assign":
+                assert stmt["value"] is stmt["expr"]
+
+
+def test_rewrite_deep_nesting():
+    # 远超默认递归上限的嵌套深度
+    node = {"stmt_type": "assign", "target": {"expr_type": "var", "name": "x"},
+            "value": {"expr_type": "binop", "op": "+", "left": {"expr_type": "var", "name": "y"},
+                      "right": {"expr_type": "literal", "value": "1"}}}
+    for _ in range(5000):
+        node = {"stmt_type": "while", "cond": {"expr_type": "var", "name": "c"}, "body": [node]}
+    root = node
+    rewritten = STRewriter(DependencyAnalyzer(), mode="rename").rewrite([root])
+    assert rewritten[0] is root
+
+
+def test_statements_annotated_with_rw_vars():
+    result = STParser().get_ast(CODE)
+    assert result["status"] == "success", result.get("message")
+    pou = STRewriter(DependencyAnalyzer(), mode="rename").rewrite(result["ast"][0])
+    assign, if_stmt = sorted(pou["body"], key=lambda s: s["stmt_type"])
+    assert (assign["_reads"], assign["_writes"]) == ({"b"}, {"a"})
+    assert (if_stmt["_reads"], if_stmt["_writes"]) == ({"a", "c"}, {"b", "c"})
+    assert DependencyAnalyzer().get_rw_vars(if_stmt) == (if_stmt["_reads"], if_stmt["_writes"])
+
+
+def test_reorder_respects_hazards():
+    def assign(target, *reads):
+        return {"stmt_type": "assign", "target": {"expr_type": "var", "name": target},
+                "value": [{"expr_type": "var", "name": r} for r in reads]}
+
+    rewriter = STRewriter(DependencyAnalyzer(), mode="rename")
+    seen = set()
+    for seed in range(50):
+        random.seed(seed)
+        body = [assign("a"), assign("b"), assign("c", "a", "b"), assign("d")]
+        order = [s["target"]["name"] for s in rewriter.rewrite(body)]
+        # c 读 a、b，必须排在两者之后；d 与其余语句无依赖，可以任意移动
+        assert order.index("c") > max(order.index("a"), order.index("b"))
+        seen.add(tuple(order))
+    assert len(seen) > 1
+
+
+def test_copy_tree_keeps_original():
+    pou = STParser().get_ast(CODE)["ast"][0]
+    snapshot = copy.deepcopy(pou)
+    rewriter = STRewriter(DependencyAnalyzer())
+    for seed in range(10):
+        random.seed(seed)
+        assert rewriter.copy_tree(pou) is not pou
+    assert pou == snapshot
+
+
+def test_rewrite_many():
+    pous = [STParser().get_ast(CODE)["ast"][0] for _ in range(4)]
+    rewriter = STRewriter(DependencyAnalyzer(), mode="rename", rename_map={"b": "speed"})
+    results = rewriter.rewrite_many(pous, workers=2, chunksize=1)
+    assert len(results) == 4
+    for pou in results:
+        assign = next(s for s in pou["body"] if s["stmt_type"] == "assign")
+        operands = (assign["value"]["left"], assign["value"]["right"])
+        assert {"expr_type": "var", "name": "speed"} in [{k: op.get(k) for k in ("expr_type", "name")} for op in operands]
+    # 单进程时原地重写
+    assert rewriter.rewrite_many(pous[:2], workers=1)[0] is pous[0]
+
+
+def test_rewrite_twice_refreshes_annotations():
+    pou = STParser().get_ast(CODE)["ast"][0]
+    STRewriter(DependencyAnalyzer(), mode="rename").rewrite(pou)
+    STRewriter(DependencyAnalyzer(), mode="rename", rename_map={"b": "q"}).rewrite(pou)
+    assign = next(s for s in pou["body"] if s["stmt_type"] == "assign")
+    assert assign["_reads"] == {"q"}
+
+
+def test_clone_tree():
+    pou = STParser().get_ast(CODE)["ast"][0]
+    clone = _clone_tree(pou)
+    assert clone == pou and clone is not pou
+    assign = next(s for s in clone["body"] if s["stmt_type"] == "assign")
+    # 别名在副本里依然指向同一个对象，且不与原树共享
+    assert assign["value"] is assign["expr"]
+    assert all(assign["value"] is not s.get("value") for s in pou["body"])
+    # 深层嵌套不受递归上限影响
+    root = node = {"stmt_type": "while", "body": []}
+    for _ in range(5000):
+        node["body"].append({"stmt_type": "while", "body": []})
+        node = node["body"][0]
+    clone = _clone_tree(root)
+    for _ in range(5000):
+        assert clone is not root and clone["stmt_type"] == "while"
+        root, clone = root["body"][0], clone["body"][0]
+    assert clone == root and clone is not root
@@ -0,0 +1,52 @@
+from src.stslicer.st_slicer import STSlicer
+
+
+def var(name):
+    return {"type": "variable", "name": name}
+
+
+def binop(left, right, op="+"):
+    return {"type": "binary_op", "op": op, "left": left, "right": right}
+
+
+def assign(target, expr):
+    return {"type": "assignment", "target": target, "expr": expr}
+
+
+def test_get_variables():
+    slicer = STSlicer([])
+    expr = binop(var("a"), {"type": "unary_op", "op": "NOT", "operand": binop(var("b"), {"type": "literal", "value": "1"})})
+    assert slicer.get_variables(expr) == {"a", "b"}
+    assert slicer.get_variables({"type": "if_statement", "condition": var("c")}) == {"c"}
+    assert slicer.get_variables(None) == set()
+    # 同一子树命中缓存，直接返回同一个对象
+    assert slicer.get_variables(expr) is slicer.get_variables(expr)
+
+    # 远超默认递归上限的表达式深度
+    deep = var("x0")
+    for i in range(1, 5000):
+        deep = binop(deep, var(f"x{i % 7}"))
+    assert slicer.get_variables(deep) == {f"x{i}" for i in range(7)}
+
+
+def test_backward_slice_set():
+    body = [
+        assign("a", var("in1")),
+        assign("unused", var("in2")),
+        assign("en", binop(var("a"), var("k"), op=">")),
+        {"type": "if_statement", "condition": var("en"),
+         "then_branch": [assign("Out", var("b"))],
+         "else_branch": [assign("other", var("z"))]},
+    ]
+    slicer = STSlicer(body)
+    sliced = slicer.backward_slice_set({"out"})
+    # 变量名不区分大小写；分支被切中后条件 en 的来源也进入切片
+    assert [s.get("target") for s in sliced] == ["a", "en", None]
+    if_stmt = sliced[-1]
+    assert if_stmt["then_branch"] == [body[3]["then_branch"][0]] and if_stmt["else_branch"] == []
+    # 原语句不被修改
+    assert len(body[3]["else_branch"]) == 1
+    # 同一个切片器可以反复查询不同的变量集合
+    sliced = slicer.backward_slice_set({"UNUSED", "other"})
+    assert sliced == body[:3] + [{**body[3], "then_branch": [], "else_branch": body[3]["else_branch"]}]
+    assert slicer.backward_slice_set({"nothing"}) == []
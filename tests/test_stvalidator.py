@@ -0,0 +1,96 @@
+import re
+import threading
+
+from src.stvailder import FastValidator, STValidator
+from src.stvailder.fast_stvailder import _is_illegal_assign
+from src.stvailder.stvailder import _count_keywords, _strip_comments
+
+
+FB = """FUNCTION_BLOCK FB_Test
+VAR start : BOOL; count : INT; END_VAR
+IF start THEN
+    FOR i := 1 TO 10 DO count := count + i; END_FOR;
+END_IF;
+END_FUNCTION_BLOCK
+"""
+
+
+# 成员访问、数组下标、大小写不同、外部枚举值、外部全局变量
+VALID_UNRESOLVED = [
+    "FUNCTION_BLOCK F\nVAR t : TON; q : BOOL; END_VAR\nq := t.Q;\nEND_FUNCTION_BLOCK",
+    "FUNCTION_BLOCK F\nVAR a : ARRAY[1..3] OF INT; q : INT; END_VAR\nq := a[1];\nEND_FUNCTION_BLOCK",
+    "FUNCTION_BLOCK F\nVAR X : INT; END_VAR\nx := X;\nEND_FUNCTION_BLOCK",
+    "FUNCTION_BLOCK F\nVAR s : E_State; END_VAR\ns := IDLE;\nEND_FUNCTION_BLOCK",
+    "FUNCTION_BLOCK F\nVAR x : INT; END_VAR\nx := g;\nEND_FUNCTION_BLOCK",
+]
+
+
+def test_check_nesting():
+    validator = STValidator()
+    body = FB.split("END_VAR")[1].replace("END_FUNCTION_BLOCK", "")
+    assert validator._check_nesting(body)[0]
+    # END_IF 里的 IF 不单独计数
+    ok, msg = validator._check_nesting(body.replace("END_FOR;", ""))
+    assert not ok and msg == "Structural imbalance: FOR(1) vs END_FOR(0)"
+    # 关键字大小写不敏感，标识符里的关键字片段不计数
+    assert validator._check_nesting(body.lower().replace("count", "if_count"))[0]
+    # VAR_INPUT / VAR_OUTPUT 共用 END_VAR，各自与 END_VAR 的总数比较
+    assert validator._check_nesting(FB) == (False, "Structural imbalance: VAR_INPUT(0) vs END_VAR(1)")
+
+
+def test_fast_validator():
+    validator = FastValidator()
+    assert validator.validate(FB) == (True, "Passed")
+    assert validator.validate(FB.replace(":= 1", "= 1;")) == (False, "Illegal assignment '='")
+    assert validator.validate(FB.replace("END_VAR", "END"))[1] == "Missing structure keywords"
+    assert validator.validate(FB.replace("INT;", "array[*] OF INT;"))[1] == "Dynamic arrays not supported"
+
+
+def test_count_keywords():
+    code = "END_IF IF_X ENDIF VAR_INPUT VAR\tEND_VAR;IF(A)END_IF ÄIF REPEAT UNTIL"
+    assert _count_keywords(code) == {"END_IF": 2, "IF": 1, "VAR_INPUT": 1, "VAR": 1, "END_VAR": 1,
+                                     "REPEAT": 1, "UNTIL": 1}
+
+
+def test_validate_deprecated():
+    validator = STValidator()
+    assert validator.validate_deprecated(FB.replace(":= 1", "= 1"))[1].startswith("Assignment Error")
+    # 注释里的 = 与关键字不参与检查
+    ok, msg = validator.validate_deprecated(FB + "// a = b END_IF\n(* x = 1 *)")
+    assert msg == "Structural imbalance: VAR_INPUT(0) vs END_VAR(1)"
+    ok, msg = validator.validate_deprecated(FB.replace("END_FUNCTION_BLOCK", ""))
+    assert msg == "Structural imbalance: FUNCTION_BLOCK(1) vs END_FUNCTION_BLOCK(0)"
+
+
+def test_strip_comments():
+    assert _strip_comments("a := 1; // x = 1\nb := 2;") == "a := 1; \nb := 2;"
+    assert _strip_comments("(* multi\nline // *)c (* *) := d;") == "c  := d;"
+    # 未闭合的块注释按原文保留，其后的行注释仍然删除
+    assert _strip_comments("(* open\nx // y\nz") == "(* open\nx \nz"
+
+
+def test_validators_share_parser():
+    first, second = STValidator(), STValidator()
+    assert first.parser is second.parser
+    other = []
+    thread = threading.Thread(target=lambda: other.append(STValidator().parser))
+    thread.start()
+    thread.join()
+    assert other[0] is not first.parser
+
+
+def test_is_illegal_assign():
+    pattern = re.compile(r"\b\w+\s*=\s*\w+;")
+    for code in ["a = b;", "a := b;", "x := a = 1;", "a <= b;", "a\n=\tb;", "= b;", "a = b", "a = ;", "_ =b;", "a　= b;"]:
+        assert _is_illegal_assign(code) == bool(pattern.search(code)), code
+
+
+def test_validate_syntax_only():
+    validator = STValidator()
+    code = "FUNCTION_BLOCK F\nVAR x : INT; y : INT; END_VAR\nx := y;\nEND_FUNCTION_BLOCK"
+    assert validator.validate(code) == (True, "Passed")
+    ok, msg = validator.validate(code.replace("x := y", "x := "))
+    assert not ok and msg.startswith("Syntax Errors:")
+    # 合法但名字无法在片段内逐一对上声明的代码不能被判错
+    for sample in VALID_UNRESOLVED:
+        assert validator.validate(sample) == (True, "Passed"), sample
@@ -100,5 +100,14 @@ def test_unparser():
     output_folder = "../data/unparsed_output"
     run_unparser_test(input_folder, output_folder)
 
+def test_unparse_deep_nesting():
+    # 远超默认递归上限的嵌套深度
+    node = {"stmt_type": "exit"}
+    for _ in range(3000):
+        node = {"stmt_type": "while", "cond": {"expr_type": "var", "name": "c"}, "body": [node]}
+    code = STUnparser().unparse(node)
+    assert code.count("END_WHILE;") == 3000
+    assert code.splitlines()[3000] == "    " * 3000 + "EXIT;"
+
 if __name__ == "__main__":
-    test_unparser()
\ No newline at end of file
+    test_unparser()
@@ -0,0 +1,23 @@
+from src import utils
+from src.utils import auto_repair, remove_st_comments
+
+
+def test_auto_repair():
+    assert auto_repair("") == ""
+    assert auto_repair("Here:\n```st\nPROGRAM P\nEND_PROGRAM\n```\nbye") == "PROGRAM P\nEND_PROGRAM"
+    assert auto_repair("  PROGRAM P END_PROGRAM \n") == "PROGRAM P END_PROGRAM"
+    assert auto_repair("import os\nPROGRAM P") == ""
+    assert auto_repair("```python\ndef f(): pass\n```") == ""
+
+
+def test_remove_st_comments():
+    code = "a := 'x // y'; // tail\n(* block\n *) b := \"(* s *)\";"
+    assert remove_st_comments(code) == "A := 'X // Y'; \n B := \"(* S *)\";"
+    assert remove_st_comments("a := '(x)'; b := c / d;") == "A := '(X)'; B := C / D;"
+
+
+def test_remove_st_comments_fallback(monkeypatch):
+    code = "a := 'x // y'; // tail\n(* block\n *) b := \"(* s *)\"; (* open"
+    expected = remove_st_comments(code)
+    monkeypatch.setattr(utils, "HAS_REGEX", False)
+    assert utils.remove_st_comments(code) == expected == "A := 'X // Y'; \n B := \"(* S *)\"; (* OPEN"
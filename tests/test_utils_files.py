@@ -0,0 +1,24 @@
+import json
+
+from src.utils_files import preshard, scan_files
+
+
+def test_scan_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.json", "sub/b.json", "sub/c.jsonl", "d.txt"):
+        (tmp_path / name).write_text("[]")
+    assert scan_files(str(tmp_path), ".json") == [str(tmp_path / "a.json"), str(tmp_path / "sub" / "b.json")]
+    assert len(scan_files(str(tmp_path), (".json", ".jsonl"))) == 3
+
+
+def test_preshard(tmp_path):
+    small, big, bad = tmp_path / "small.json", tmp_path / "big.json", tmp_path / "bad.json"
+    small.write_text("[1]")
+    big.write_text(json.dumps([{"output": "x" * 40}] * 4))
+    bad.write_text('{"output": "' + "x" * 100 + '"}')
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    files = preshard([str(small), str(big), str(bad)], str(shard_dir), max_bytes=50)
+    # 小文件与无法切分的文件原样保留
+    assert files[0] == str(small) and files[-1] == str(bad)
+    assert files[1:-1] == [str(shard_dir / f"big.part00{i}.json") for i in range(4)]
@@ -0,0 +1,132 @@
+import io
+import json
+
+import pytest
+
+from src import utils_json
+from src.tools.convert_logs_to_dataset import convert_logs_to_dataset, convert_many
+from src.tools.fix_json_schema import fix_jsonl_file
+from src.tools.make_dpo_dataset import create_dpo_negatives
+
+
+RECORD = {"instruction": "写一个计数器", "output": "c := c + 1;", "n": [1, 2.5, None, True], "meta": {}}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_stdlib(monkeypatch, use_orjson):
+    monkeypatch.setattr(utils_json, "HAS_ORJSON", utils_json.HAS_ORJSON and use_orjson)
+    assert utils_json.dumps(RECORD) == json.dumps(RECORD, ensure_ascii=False, separators=(",", ":"))
+    assert utils_json.dumps([RECORD], indent=True) == json.dumps([RECORD], ensure_ascii=False, indent=2)
+    assert utils_json.loads(utils_json.dumps_bytes(RECORD)) == RECORD
+
+
+def test_decode_error_is_stdlib_error():
+    with pytest.raises(json.JSONDecodeError):
+        utils_json.loads('{"a": ')
+
+
+def test_convert_logs_to_dataset(tmp_path):
+    logs = [{"instruction": "任务", "rejected_samples": [{"code": "x := 1;", "error": "e"}, {"code": "  "}]}]
+    src = tmp_path / "failed.json"
+    src.write_text(json.dumps(logs), encoding="utf-8")
+    convert_logs_to_dataset(str(src))
+    out = json.loads((tmp_path / "failed_converted.json").read_text(encoding="utf-8"))
+    assert out == [{"instruction": "任务", "input": "", "output": "x := 1;", "original_error": "e"}]
+    assert b"\n" not in (tmp_path / "failed_converted.json").read_bytes()
+
+
+def test_make_dpo_dataset(tmp_path):
+    errors = [{"instruction": "任务", "output": "x = 1;", "st_metadata": {"error": "bad"}}, {"instruction": "", "output": "y"}]
+    src = tmp_path / "matiec_error.json"
+    src.write_text(json.dumps(errors), encoding="utf-8")
+    create_dpo_negatives(str(src), str(tmp_path / "dpo.jsonl"))
+    lines = (tmp_path / "dpo.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["rejected"] for line in lines] == ["x = 1;"]
+    assert json.loads(lines[0])["metadata"]["compiler_traceback"] == "bad"
+
+
+def test_iter_lines():
+    data = '{"a": 1}\n\n{"b": "中文"}\r\n{"c": 3}'.encode("utf-8")
+    for chunk_size in (1, 3, 1 << 20):
+        assert list(utils_json.iter_lines(io.BytesIO(data), chunk_size)) == data.split(b"\n")
+    assert list(utils_json.iter_lines(io.BytesIO(b"x\n"))) == [b"x"]
+
+
+def test_fix_jsonl_file(tmp_path):
+    src = tmp_path / "records.jsonl"
+    src.write_text('{"last_code_snippet": ["a := 1;"]}\n  \nnot json\n{"last_code_snippet": "b"}\n', encoding="utf-8")
+    fix_jsonl_file(str(src), str(tmp_path / "out" / "fixed.jsonl"))
+    lines = (tmp_path / "out" / "fixed.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"last_code_snippet": '["a := 1;"]'}, {"last_code_snippet": "b"}]
+    # 无需修复的行原样写出
+    assert lines[1] == '{"last_code_snippet": "b"}'
+
+
+def test_write_array_matches_indented_dumps():
+    for items in ([], [RECORD], [RECORD, "多行\n字符串", [], {"x": [1, {"y": None}]}]):
+        out = io.BytesIO()
+        assert utils_json.write_array(out, iter(items)) == len(items)
+        assert out.getvalue().decode("utf-8") == json.dumps(items, ensure_ascii=False, indent=2)
+        assert list(utils_json.iter_array(io.BytesIO(out.getvalue()))) == items
+        compact = io.BytesIO()
+        assert utils_json.write_array(compact, iter(items), indent=False) == len(items)
+        assert compact.getvalue() == utils_json.dumps_bytes(items)
+
+
+def test_convert_logs_bad_input_keeps_output(tmp_path):
+    src = tmp_path / "failed.json"
+    src.write_text('[{"instruction": "a", "rejected_samples": [{"code": "x"}]}, {"instr', encoding="utf-8")
+    out = tmp_path / "out.json"
+    out.write_text("old", encoding="utf-8")
+    convert_logs_to_dataset(str(src), str(out))
+    assert out.read_text(encoding="utf-8") == "old"
+    assert list(tmp_path.iterdir()) and not (tmp_path / "out.json.tmp").exists()
+
+
+def test_convert_many(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"shard{i}.json"
+        path.write_text(json.dumps([{"instruction": f"t{i}", "rejected_samples": [{"code": f"x := {i};"}]}]), encoding="utf-8")
+        paths.append(str(path))
+    stats = convert_many(paths, workers=2)
+    assert [s["extracted_samples"] for s in stats] == [1, 1, 1]
+    out = json.loads((tmp_path / "shard2_converted.json").read_text(encoding="utf-8"))
+    assert out[0]["output"] == "x := 2;"
+
+
+def test_load_mmap(tmp_path):
+    path = tmp_path / "data.json"
+    for data, expected in ((json.dumps([RECORD]), [RECORD]), ("", None), ("[1,", None)):
+        path.write_text(data, encoding="utf-8")
+        with open(path, "rb") as f:
+            if expected is None:
+                with pytest.raises(json.JSONDecodeError):
+                    utils_json.load(f)
+            else:
+                assert utils_json.load(f) == expected
+
+
+def test_split_array(tmp_path):
+    items = [dict(RECORD, i=i) for i in range(10)]
+    src = tmp_path / "big.json"
+    src.write_text(json.dumps(items), encoding="utf-8")
+    item_bytes = len(utils_json.dumps_bytes(items[0]))
+    shards = utils_json.split_array(str(src), str(tmp_path), max_bytes=3 * item_bytes)
+    assert [p.rsplit("/", 1)[-1] for p in shards] == [f"big.part00{i}.json" for i in range(4)]
+    loaded = [json.loads(open(p, encoding="utf-8").read()) for p in shards]
+    assert [len(part) for part in loaded] == [3, 3, 3, 1]
+    assert sum(loaded, []) == items
+    src.write_text("[]", encoding="utf-8")
+    assert utils_json.split_array(str(src), str(tmp_path)) == []
+
+
+@pytest.mark.parametrize("use_ijson", [False, True])
+def test_iter_array_rejects_non_array(monkeypatch, use_ijson):
+    if use_ijson:
+        pytest.importorskip("ijson")
+    monkeypatch.setattr(utils_json, "HAS_IJSON", use_ijson)
+    assert list(utils_json.iter_array(io.BytesIO(b'[1, {"a": [2.5]}]'))) == [1, {"a": [2.5]}]
+    for data in (b'{"a": [1]}', b"3", b""):
+        with pytest.raises(json.JSONDecodeError):
+            list(utils_json.iter_array(io.BytesIO(data)))